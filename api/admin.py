@@ -4,6 +4,24 @@ from django.apps import apps
 from django.contrib import admin
 
 from api.apps import ApiConfig
+from api.models import GenreTitle
+
+
+class GenreTitleInline(admin.TabularInline):
+    # у M2M с явной промежуточной моделью нет поля в форме произведения,
+    # жанры редактируются строками GenreTitle
+    model = GenreTitle
+    extra = 1
+
+
+class TitleAdmin(admin.ModelAdmin):
+    readonly_fields = ('rating', 'score_sum', 'score_count')
+    inlines = (GenreTitleInline,)
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('to', 'subject', 'status', 'attempts', 'next_attempt_at')
+    list_filter = ('status',)
 
 
 def model_register(*app_list):
@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Role, User
+
+USER_CLAIMS = ('username', 'role')
+USER_SNAPSHOT_KEY = 'api:jwt-user:{}'
+
+
+def get_role(user):
+    # права суперпользователя и staff сворачиваются в роль,
+    # чтобы собранный из токена пользователь их не потерял
+    if user.is_admin:
+        return Role.ADMIN
+    if user.is_moderator:
+        return Role.MODERATOR
+    return user.role
+
+
+def get_tokens_for_user(user):
+    refresh = RefreshToken.for_user(user)
+    refresh['username'] = user.username
+    refresh['role'] = get_role(user)
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
+
+def get_user_snapshot(user_id):
+    # имя и роль из базы не чаще раза в REVALIDATE_TTL секунд, при нуле -
+    # на каждый вызов; сигнал сбрасывает снимок при изменении пользователя
+    ttl = settings.STATELESS_JWT['REVALIDATE_TTL']
+    key = USER_SNAPSHOT_KEY.format(user_id)
+    snapshot = cache.get(key) if ttl else None
+    if snapshot is None:
+        user = User.objects.filter(pk=user_id, is_active=True).only(
+            'username', 'role', 'is_superuser', 'is_staff'
+        ).first()
+        snapshot = (
+            {'username': user.username, 'role': get_role(user)}
+            if user is not None else {}
+        )
+        if ttl:
+            cache.set(key, snapshot, ttl)
+    return snapshot
+
+
+def get_full_user(user):
+    if getattr(user, 'from_token', False):
+        return User.objects.get(pk=user.pk)
+    return user
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """Пользователь собирается из утверждений токена, без запроса к базе.
+
+    Токены без утверждений username и role, выданные раньше, проверяются
+    по базе, как в JWTAuthentication. Запросы на запись сверяются с базой
+    всегда: записи от удалённого пользователя нарушили бы внешние ключи.
+    """
+
+    def authenticate(self, request):
+        # экземпляр создаётся на каждый запрос
+        self.revalidate = (
+            request.method not in SAFE_METHODS
+            or bool(settings.STATELESS_JWT['REVALIDATE_TTL'])
+        )
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if not all(claim in validated_token for claim in USER_CLAIMS):
+            return super().get_user(validated_token)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        claims = {claim: validated_token[claim] for claim in USER_CLAIMS}
+        if self.revalidate:
+            claims = get_user_snapshot(user_id)
+            if not claims:
+                raise AuthenticationFailed(
+                    'Пользователь не найден или заблокирован',
+                    code='user_not_found'
+                )
+        user = User(id=user_id, **claims)
+        user._state.adding = False
+        # у такого пользователя заполнены только id, username и role
+        user.from_token = True
+        return user
@@ -0,0 +1,197 @@
+import logging
+import threading
+from bisect import bisect_left, insort
+
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+
+from .batching import SQLITE_MAX_BATCH
+from .cache import VERSION_KEY, bump_version, get_version
+from .models import Category, Genre, Title
+
+logger = logging.getLogger(__name__)
+
+VERSION_NAME = 'autocomplete'
+# запись увеличивает версию на единицу и кладёт изменённые записи в
+# журнал под новым номером; bump_version ставит новое время, и разрыв
+# в журнале означает полную перестройку индекса
+CHANGES_KEY = 'api:autocomplete:changes:{}'
+CHANGES_TIMEOUT = 60 * 60
+# больше изменённых записей дешевле перечитать целиком; список pk
+# должен уложиться в лимит параметров SQLite
+MAX_SYNC = SQLITE_MAX_BATCH
+SOURCES = {
+    'title': (Title, ('id', 'name')),
+    'genre': (Genre, ('id', 'name', 'slug')),
+    'category': (Category, ('id', 'name', 'slug')),
+}
+
+
+KINDS = {model: kind for kind, (model, _) in SOURCES.items()}
+
+
+def normalize(value):
+    return ' '.join(value.lower().split())
+
+
+def word_suffixes(name):
+    # «Крестный отец» ищется и по «крес», и по «отец»
+    words = normalize(name).split(' ')
+    return [' '.join(words[start:]) for start in range(len(words))]
+
+
+def log_changes(changes):
+    try:
+        version = cache.incr(VERSION_KEY.format(VERSION_NAME))
+    except ValueError:
+        # версия вытеснена из кэша: новая версия не продолжает журнал,
+        # и все процессы перестроят индекс
+        get_version(VERSION_NAME)
+        return None
+    cache.set(CHANGES_KEY.format(version), list(changes), CHANGES_TIMEOUT)
+    return version
+
+
+def read_changes(start, end):
+    if start is None or not 0 < end - start <= MAX_SYNC:
+        return None
+    keys = [CHANGES_KEY.format(number) for number in range(start + 1, end + 1)]
+    entries = cache.get_many(keys)
+    if len(entries) < len(keys):
+        return None
+    changes = {tuple(change) for entry in entries.values() for change in entry}
+    return changes if len(changes) <= MAX_SYNC else None
+
+
+def changed(kind, pks):
+    # записи в обход сигналов (bulk_create, bulk_update): после фиксации
+    # все процессы, включая этот, перечитают их по журналу
+    changes = [(kind, pk) for pk in pks]
+    if len(changes) > MAX_SYNC:
+        transaction.on_commit(lambda: bump_version(VERSION_NAME))
+    elif changes:
+        transaction.on_commit(lambda: log_changes(changes))
+
+
+class PrefixIndex:
+    """Отсортированный массив ключей (суффикс, тип, id) и поиск bisect."""
+
+    def __init__(self):
+        self.keys = []
+        self.items = {}
+        self.version = None
+        self.lock = threading.RLock()
+
+    def build(self):
+        # версия читается до обхода базы: записи, сделанные во время
+        # построения, потом перечитаются по журналу
+        version = get_version(VERSION_NAME)
+        keys, items = [], {}
+        for kind, (model, fields) in SOURCES.items():
+            for row in model.objects.values(*fields).iterator():
+                item = dict(type=kind, **row)
+                item_keys = [
+                    (suffix, kind, row['id'])
+                    for suffix in word_suffixes(row['name'])
+                ]
+                items[(kind, row['id'])] = (item, item_keys)
+                keys.extend(item_keys)
+        keys.sort()
+        with self.lock:
+            self.keys, self.items = keys, items
+            self.version = version
+
+    def warm_up(self):
+        try:
+            self.build()
+        except DatabaseError:
+            # база ещё не готова (например, до migrate) - построим позже
+            logger.warning('Индекс автодополнения не построен при старте')
+
+    def ensure_fresh(self):
+        # записи в других процессах перечитываем по журналу, а если его
+        # не хватает (сброс версии, вытеснение) - перестраиваем индекс
+        version = get_version(VERSION_NAME)
+        if version == self.version:
+            return
+        changes = read_changes(self.version, version)
+        if changes is None:
+            self.build()
+        else:
+            self.sync(changes, version)
+
+    def sync(self, changes, version):
+        pks = {}
+        for kind, pk in changes:
+            pks.setdefault(kind, []).append(pk)
+        # база читается под блокировкой: add() этого процесса с более
+        # новыми данными применится уже после
+        with self.lock:
+            rows = {}
+            for kind, kind_pks in pks.items():
+                model, fields = SOURCES[kind]
+                for row in model.objects.filter(
+                    pk__in=kind_pks
+                ).values(*fields):
+                    rows[(kind, row['id'])] = row
+            for kind, pk in changes:
+                self._remove(kind, pk)
+                if (kind, pk) in rows:
+                    self._add(kind, rows[(kind, pk)])
+            if self.version is None or self.version < version:
+                self.version = version
+
+    def add(self, kind, instance):
+        model, fields = SOURCES[kind]
+        row = {field: getattr(instance, field) for field in fields}
+        with self.lock:
+            self._remove(kind, instance.pk)
+            self._add(kind, row)
+            self._commit(kind, instance.pk)
+
+    def remove(self, kind, pk):
+        with self.lock:
+            self._remove(kind, pk)
+            self._commit(kind, pk)
+
+    def _add(self, kind, row):
+        item_keys = [
+            (suffix, kind, row['id']) for suffix in word_suffixes(row['name'])
+        ]
+        for key in item_keys:
+            insort(self.keys, key)
+        self.items[(kind, row['id'])] = (dict(type=kind, **row), item_keys)
+
+    def _remove(self, kind, pk):
+        _, item_keys = self.items.pop((kind, pk), (None, ()))
+        for key in item_keys:
+            position = bisect_left(self.keys, key)
+            if position < len(self.keys) and self.keys[position] == key:
+                del self.keys[position]
+
+    def _commit(self, kind, pk):
+        # свой процесс уже обновлён, остальные перечитают запись по
+        # журналу; если индекс и до записи отставал, он догонит версию
+        # при следующем поиске
+        version = log_changes([(kind, pk)])
+        if version is not None and self.version == version - 1:
+            self.version = version
+
+    def search(self, query, limit=10):
+        self.ensure_fresh()
+        prefix = normalize(query)
+        results, seen = [], set()
+        with self.lock:
+            position = bisect_left(self.keys, (prefix,))
+            while position < len(self.keys) and len(results) < limit:
+                suffix, kind, pk = self.keys[position]
+                if not suffix.startswith(prefix):
+                    break
+                if (kind, pk) not in seen:
+                    seen.add((kind, pk))
+                    results.append(self.items[(kind, pk)][0])
+                position += 1
+        return results
+
+
+index = PrefixIndex()
@@ -0,0 +1,9 @@
+# id одной пачки уходят в запрос списком pk__in и должны уложиться в
+# лимит параметров SQLite (999 в сборках до 3.32)
+SQLITE_MAX_BATCH = 500
+
+
+def limit_batch_size(connection, batch_size):
+    if connection.vendor == 'sqlite':
+        return min(batch_size, SQLITE_MAX_BATCH)
+    return batch_size
@@ -0,0 +1,269 @@
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import router, transaction
+
+VERSION_KEY = 'api:version:{}'
+
+
+def get_version(name):
+    # версия - время последней записи в наносекундах: после вытеснения
+    # ключа из кэша новая версия не совпадёт ни с одной прежней
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*names):
+    version = time.time_ns()
+    cache.set_many(
+        {VERSION_KEY.format(name): version for name in names}, None
+    )
+
+
+def make_key(prefix, *parts):
+    digest = hashlib.md5(
+        '|'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+    return f'api:{prefix}:{digest}'
+
+
+class Flight:
+    __slots__ = ('event', 'value', 'done')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.done = False
+
+
+class SingleFlight:
+    """Одно вычисление на ключ при промахе, остальные ждут его результат.
+
+    В процессе ожидание идёт на Event, между воркерами - через блокировку
+    cache.add в общем кэше. Значение хранится вместе со сроком свежести:
+    после него ещё stale_timeout секунд отдаётся старое значение, пока
+    один запрос его пересчитывает.
+    """
+
+    HIT, STALE, MISS = 'HIT', 'STALE', 'MISS'
+
+    def __init__(self, alias='default', lock_timeout=30, wait_timeout=10,
+                 poll_interval=0.05):
+        self.alias = alias
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get_or_set(self, key, compute, timeout, stale_timeout=0):
+        entry = self.cache.get(key)
+        if entry is not None and time.time() < entry[1]:
+            return entry[0], self.HIT
+        flight, leader = self.join(key)
+        if not leader:
+            if entry is not None:
+                # значение уже пересчитывают в этом процессе
+                return entry[0], self.STALE
+            if flight.event.wait(self.wait_timeout) and flight.done:
+                return flight.value, self.HIT
+            # вычислитель упал или не успел - считаем сами
+            return self.store(key, compute, timeout, stale_timeout), self.MISS
+        try:
+            token = self.lock_key(key)
+            if token is None:
+                # пересчитывает другой воркер
+                if entry is not None:
+                    return entry[0], self.STALE
+                value = self.wait(key)
+                if value is not None:
+                    flight.value, flight.done = value, True
+                    return value, self.HIT
+            try:
+                value = self.store(key, compute, timeout, stale_timeout)
+            finally:
+                if token is not None:
+                    self.unlock_key(key, token)
+            flight.value, flight.done = value, True
+            return value, self.MISS
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.event.set()
+
+    def join(self, key):
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self.flights[key] = Flight()
+            return flight, True
+
+    def lock_key(self, key):
+        token = uuid.uuid4().hex
+        if self.cache.add(f'{key}:lock', token, self.lock_timeout):
+            return token
+        return None
+
+    def unlock_key(self, key, token):
+        if self.cache.get(f'{key}:lock') == token:
+            self.cache.delete(f'{key}:lock')
+
+    def wait(self, key):
+        # значение считает другой воркер
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            entry = self.cache.get(key)
+            if entry is not None:
+                return entry[0]
+        return None
+
+    def store(self, key, compute, timeout, stale_timeout):
+        value = compute()
+        self.cache.set(
+            key, (value, time.time() + timeout), timeout + stale_timeout
+        )
+        return value
+
+    def clear(self):
+        self.cache.clear()
+
+
+class ObjectCache:
+    """Представления объектов по id и версиям данных.
+
+    Версии в ключе те же, из которых строится ETag: после записи новая
+    версия не совпадает с ключом значения, посчитанного до фиксации.
+    """
+
+    def __init__(self, alias, prefix, stale_timeout=0):
+        self.prefix = prefix
+        self.stale_timeout = stale_timeout
+        self.flight = SingleFlight(alias)
+        # счётчики на процесс, без блокировок: допускают неточность
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_set(self, pk, versions, compute):
+        value, status = self.flight.get_or_set(
+            make_key(self.prefix, pk, *versions), compute,
+            self.flight.cache.default_timeout, self.stale_timeout
+        )
+        if status == SingleFlight.MISS:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value, status
+
+    def clear(self):
+        self.flight.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else None,
+        }
+
+
+class SlugCache:
+    """slug -> (id, name) в памяти процесса, сверяется с версией в кэше.
+
+    Запись категории или жанра меняет версию, и при следующем обращении
+    словарь начинается заново. Неизвестные slug загружаются одним
+    запросом на все сразу.
+    """
+
+    def __init__(self, model, version_name):
+        self.model = model
+        self.version_name = version_name
+        self.items = {}
+        self.version = None
+        self.lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        # DRF копирует аргументы полей для каждого сериализатора,
+        # а кэш должен оставаться общим на процесс
+        return self
+
+    def resolve(self, slugs):
+        slugs = set(slugs)
+        version = get_version(self.version_name)
+        with self.lock:
+            if version != self.version:
+                self.items, self.version = {}, version
+            items = self.items
+        missing = slugs.difference(items)
+        if missing:
+            loaded = {
+                slug: (pk, name) for slug, pk, name in
+                self.model.objects.filter(slug__in=missing)
+                .values_list('slug', 'id', 'name')
+            }
+            # отсутствующие в базе slug не запоминаем: их могут создать
+            items.update(loaded)
+        return {
+            slug: self.build(slug, *items[slug])
+            for slug in slugs if slug in items
+        }
+
+    def build(self, slug, pk, name):
+        # как после загрузки из базы: такой объект можно передать в
+        # ForeignKey и в add()/set() связи многие-ко-многим
+        obj = self.model(id=pk, slug=slug, name=name)
+        obj._state.adding = False
+        obj._state.db = router.db_for_read(self.model)
+        return obj
+
+
+title_cache = ObjectCache(
+    'titles', 'title', stale_timeout=settings.CACHE_STALE_TIMEOUT
+)
+list_cache = SingleFlight()
+
+
+def invalidate_all():
+    # данные изменены в обход сигналов: migrate, flush, импорт
+    bump_version_on_commit(
+        'titles', 'reviews', 'categories', 'genres', 'autocomplete'
+    )
+    title_cache.clear()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(title_cache.clear)
+
+
+def bump_version_on_commit(*names):
+    # сразу и ещё раз после фиксации: ответ, посчитанный параллельным
+    # запросом по данным до фиксации, остаётся под промежуточной версией
+    # и больше не читается
+    bump_version(*names)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_version(*names))
+
+
+def bump_title_versions_on_commit(title_ids):
+    # повторно после фиксации: карточка, посчитанная параллельным запросом
+    # до фиксации, осталась под прежней версией и больше не читается
+    names = [f'title:{pk}' for pk in title_ids]
+    if names:
+        transaction.on_commit(lambda: bump_version(*names))
+
+
+def titles_saved(title_ids):
+    # для записей произведений в обход сигналов: bulk_create, bulk_update;
+    # индекс автодополнения обновляет autocomplete.changed
+    bump_version_on_commit('titles', *(f'title:{pk}' for pk in title_ids))
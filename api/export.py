@@ -0,0 +1,173 @@
+import csv
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+
+from .batching import SQLITE_MAX_BATCH
+from .models import Comment, Review, Title
+from .serializers import (CommentValuesSerializer, ReviewValuesSerializer,
+                          TitleValuesSerializer)
+
+# отзывы и комментарии читаются страницами такого размера
+EMBED_PAGE_SIZE = 500
+# ответ отдаётся кусками не меньше этого размера
+WRITE_BUFFER_SIZE = 64 * 1024
+OUTPUTS = ('ndjson', 'csv')
+
+
+def iter_chunks(serializer, chunk_size):
+    # курсор по id вместо OFFSET: каждая пачка - один запрос по индексу
+    columns = serializer.get_columns()
+    last_id = 0
+    while True:
+        rows = list(
+            Title.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values(*columns)[:chunk_size]
+        )
+        if not rows:
+            return
+        last_id = rows[-1]['id']
+        yield rows, serializer.to_representation(rows)
+
+
+def after(key, values):
+    # строки, идущие после values в порядке key: (a, b) > (x, y)
+    condition = Q()
+    for index, field in enumerate(key):
+        condition |= Q(
+            **dict(zip(key[:index], values)),
+            **{f'{field}__gt': values[index]}
+        )
+    return condition
+
+
+def iter_keyset(queryset, key, columns):
+    # строки по возрастанию key; в памяти не больше одной страницы
+    queryset = queryset.order_by(*key).values(
+        *OrderedDict.fromkeys((*key, *columns))
+    )
+    last = None
+    while True:
+        page = queryset
+        if last is not None:
+            page = page.filter(after(key, last))
+        count = 0
+        for row in page[:EMBED_PAGE_SIZE].iterator():
+            count += 1
+            yield row
+        if count < EMBED_PAGE_SIZE:
+            return
+        last = [row[field] for field in key]
+
+
+class Stream:
+    """Строки, упорядоченные по группе, с выборкой одной группы за раз."""
+
+    def __init__(self, rows, group):
+        self.rows = iter(rows)
+        self.group = group
+        self.head = next(self.rows, None)
+
+    def take(self, value):
+        while self.head is not None and self.head[self.group] == value:
+            row, self.head = self.head, next(self.rows, None)
+            yield row
+
+
+def open_object(data, name):
+    # объект без закрывающей скобки, следом идёт массив name
+    prefix = json.dumps(data, ensure_ascii=False)[:-1]
+    return f'{prefix}{", " if data else ""}"{name}": ['
+
+
+def iter_embedded(title_ids, title_lines, with_comments):
+    # отзывы и комментарии идут потоком по ключам (произведение, отзыв,
+    # комментарий) и склеиваются с произведениями по мере записи
+    serializer = ReviewValuesSerializer()
+    reviews = Stream(iter_keyset(
+        Review.objects.filter(title_id__in=title_ids),
+        ('title_id', 'id'), serializer.get_columns()
+    ), 'title_id')
+    if with_comments:
+        comment_serializer = CommentValuesSerializer()
+        comments = Stream(iter_keyset(
+            Comment.objects.filter(review__title_id__in=title_ids),
+            ('review__title_id', 'review_id', 'id'),
+            comment_serializer.get_columns()
+        ), 'review_id')
+    for title_id, title in zip(title_ids, title_lines):
+        # ?fields=/?omit= относятся к произведениям, отзывы выгружаются
+        # целиком
+        yield open_object(title, 'reviews')
+        for index, row in enumerate(reviews.take(title_id)):
+            review = serializer.to_representation([row])[0]
+            if index:
+                yield ', '
+            if not with_comments:
+                yield json.dumps(review, ensure_ascii=False)
+                continue
+            yield open_object(review, 'comments')
+            for comment_index, comment in enumerate(
+                comments.take(row['id'])
+            ):
+                if comment_index:
+                    yield ', '
+                yield json.dumps(
+                    comment_serializer.to_representation([comment])[0],
+                    ensure_ascii=False
+                )
+            yield ']}'
+        yield ']}\n'
+
+
+def buffered(parts):
+    buffer, length = [], 0
+    for part in parts:
+        buffer.append(part)
+        length += len(part)
+        if length >= WRITE_BUFFER_SIZE:
+            yield ''.join(buffer).encode()
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def iter_ndjson(request, embed=()):
+    serializer = TitleValuesSerializer(request)
+    for rows, titles in iter_chunks(serializer, SQLITE_MAX_BATCH):
+        if embed:
+            yield from buffered(iter_embedded(
+                [row['id'] for row in rows], titles, 'comments' in embed
+            ))
+            continue
+        yield ''.join(
+            json.dumps(title, ensure_ascii=False) + '\n' for title in titles
+        ).encode()
+
+
+class Echo:
+    # csv.writer пишет строку в файл, а нам нужна сама строка
+
+    def write(self, value):
+        return value
+
+
+def to_csv_value(value):
+    if isinstance(value, OrderedDict):
+        return value['slug']
+    if isinstance(value, list):
+        return ','.join(item['slug'] for item in value)
+    return value
+
+
+def iter_csv(request):
+    serializer = TitleValuesSerializer(request)
+    writer = csv.writer(Echo())
+    yield writer.writerow(serializer.fields).encode()
+    for _, titles in iter_chunks(serializer, SQLITE_MAX_BATCH):
+        yield ''.join(
+            writer.writerow([to_csv_value(value) for value in title.values()])
+            for title in titles
+        ).encode()
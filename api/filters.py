@@ -1,17 +1,29 @@
 from django_filters import rest_framework as filters
 
 from .models import Title
+from .search import search_titles
 
 
 class TitleFilter(filters.FilterSet):
-    genre = filters.CharFilter(field_name='genre__slug', lookup_expr='iexact')
+    # slug хранится в нижнем регистре (см. Category.save и Genre.save),
+    # поэтому точное сравнение попадает в индекс, в отличие от iexact
+    genre = filters.CharFilter(field_name='genre__slug', method='filter_slug')
     name = filters.CharFilter(field_name='name', lookup_expr='icontains')
-    year = filters.CharFilter(field_name='year', lookup_expr='iexact')
+    search = filters.CharFilter(method='filter_search')
+    year = filters.NumberFilter(field_name='year')
+    year_min = filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = filters.NumberFilter(field_name='year', lookup_expr='lte')
     category = filters.CharFilter(
         field_name='category__slug',
-        lookup_expr='iexact'
+        method='filter_slug'
     )
 
     class Meta:
         fields = '__all__'
         model = Title
+
+    def filter_slug(self, queryset, name, value):
+        return queryset.filter(**{name: value.lower()})
+
+    def filter_search(self, queryset, name, value):
+        return search_titles(queryset, value)
@@ -0,0 +1,261 @@
+import csv
+import io
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import UniqueConstraint
+
+from .batching import limit_batch_size
+from .cache import invalidate_all
+from .models import Category, Comment, Genre, GenreTitle, Review, Title, User
+
+# порядок загрузки учитывает внешние ключи; для колонок, чьё имя
+# не совпадает с полем модели, указано поле
+TABLES = (
+    ('users', User, {'description': 'bio'}),
+    ('category', Category, {}),
+    ('genre', Genre, {}),
+    ('titles', Title, {'category': 'category_id'}),
+    ('genre_title', GenreTitle, {}),
+    ('review', Review, {'author': 'author_id'}),
+    ('comments', Comment, {'author': 'author_id'}),
+)
+COPY_NULL = r'\N'
+
+
+@contextmanager
+def keep_auto_now_add(model, attnames):
+    # bulk_create заполняет auto_now_add текущим временем,
+    # а при импорте даты из файла нужно сохранить
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)
+              and field.attname in attnames]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Загружает строки в модель пачками с upsert по первичному ключу.
+
+    Строки - последовательности значений в порядке заголовка, поэтому
+    один загрузчик читает и csv.reader, и листы XLSX. В памяти держится
+    только одна пачка. На PostgreSQL пачка идёт через COPY во временную
+    таблицу и INSERT ... ON CONFLICT, на остальных базах - через
+    bulk_create и bulk_update. Новые строки, нарушающие другие
+    ограничения уникальности, пропускаются.
+    """
+
+    def __init__(self, model, header, renames=None, batch_size=1000,
+                 use_copy=None):
+        renames = renames or {}
+        self.model = model
+        self.fields = [
+            model._meta.get_field(renames.get(name, name)) for name in header
+        ]
+        self.attnames = {field.attname for field in self.fields}
+        self.update_fields = [
+            field.name for field in self.fields if not field.primary_key
+        ]
+        self.batch_size = limit_batch_size(connection, batch_size)
+        if use_copy is None:
+            use_copy = connection.vendor == 'postgresql'
+        self.use_copy = use_copy
+
+    def to_python(self, field, value):
+        if value is None or value == '':
+            if field.null:
+                return None
+            if field.empty_strings_allowed:
+                return ''
+        if isinstance(value, float) and value.is_integer():
+            # числа из ячеек XLSX приходят как float: 1994.0
+            value = int(value)
+        return field.to_python(value)
+
+    def build(self, row):
+        obj = self.model(**{
+            field.attname: self.to_python(field, value)
+            for field, value in zip(self.fields, row)
+        })
+        if isinstance(obj, (Category, Genre)):
+            # save() при загрузке не вызывается: slug приводится
+            # к нижнему регистру здесь, как в Category.save и Genre.save
+            obj.slug = obj.slug.lower()
+        return obj
+
+    def build_many(self, rows, first_number):
+        batch = []
+        for number, row in enumerate(rows, first_number):
+            try:
+                batch.append(self.build(row))
+            except ValidationError as error:
+                raise ValidationError(
+                    f'{self.model._meta.verbose_name}, строка {number}: '
+                    f'{"; ".join(error.messages)}'
+                )
+        return batch
+
+    def load(self, rows):
+        rows = iter(rows)
+        stats = {'rows': 0, 'created': 0, 'updated': 0, 'skipped': 0}
+        started = time.monotonic()
+        with transaction.atomic():
+            if self.use_copy:
+                self.create_copy_table()
+            while True:
+                batch = self.build_many(
+                    islice(rows, self.batch_size), stats['rows'] + 1
+                )
+                if not batch:
+                    break
+                save = self.copy_batch if self.use_copy else self.save_batch
+                created, updated = save(batch)
+                stats['rows'] += len(batch)
+                stats['created'] += created
+                stats['updated'] += updated
+                stats['skipped'] += len(batch) - created - updated
+        stats['seconds'] = time.monotonic() - started
+        return stats
+
+    def save_batch(self, batch):
+        manager = self.model._default_manager
+        existing = set(manager.filter(
+            pk__in=[obj.pk for obj in batch]
+        ).values_list('pk', flat=True))
+        new = [obj for obj in batch if obj.pk not in existing]
+        with keep_auto_now_add(self.model, self.attnames):
+            manager.bulk_create(new, ignore_conflicts=True)
+        if existing and self.update_fields:
+            manager.bulk_update(
+                [obj for obj in batch if obj.pk in existing],
+                self.update_fields
+            )
+        created = manager.filter(pk__in=[obj.pk for obj in new]).count()
+        return created, len(existing)
+
+    def get_unique_columns(self):
+        opts = self.model._meta
+        groups = [
+            [field.name] for field in opts.concrete_fields
+            if field.unique and not field.primary_key
+        ]
+        groups += [list(fields) for fields in opts.unique_together]
+        groups += [
+            list(constraint.fields) for constraint in opts.constraints
+            if isinstance(constraint, UniqueConstraint)
+            and constraint.condition is None
+        ]
+        return [
+            [opts.get_field(name).column for name in group]
+            for group in groups
+        ]
+
+    @property
+    def copy_table(self):
+        return connection.ops.quote_name(f'import_{self.model._meta.db_table}')
+
+    def create_copy_table(self):
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {self.copy_table} '
+                f'(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP'
+            )
+
+    def copy_value(self, field, obj):
+        # поля, которых нет в файле, получают значения по умолчанию модели
+        value = field.pre_save(obj, add=field.attname not in self.attnames)
+        value = field.get_db_prep_save(value, connection)
+        if value is None:
+            return COPY_NULL
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        return value
+
+    def drop_unique_conflicts(self, cursor):
+        # ON CONFLICT обрабатывает только первичный ключ: строки, которые
+        # нарушат другие ограничения уникальности, удаляются заранее
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        pk = quote(self.model._meta.pk.column)
+        for columns in self.get_unique_columns():
+            same = ' AND '.join(
+                f'new.{quote(column)} = old.{quote(column)}'
+                for column in columns
+            )
+            cursor.execute(
+                f'DELETE FROM {self.copy_table} new USING {table} old '
+                f'WHERE {same} AND new.{pk} <> old.{pk}'
+            )
+            cursor.execute(
+                f'DELETE FROM {self.copy_table} new '
+                f'USING {self.copy_table} old '
+                f'WHERE {same} AND new.{pk} > old.{pk}'
+            )
+
+    def copy_batch(self, batch):
+        quote = connection.ops.quote_name
+        fields = self.model._meta.concrete_fields
+        columns = ', '.join(quote(field.column) for field in fields)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in batch:
+            writer.writerow([self.copy_value(field, obj) for field in fields])
+        buffer.seek(0)
+        pk = quote(self.model._meta.pk.column)
+        updates = ', '.join(
+            f'{quote(field.column)} = EXCLUDED.{quote(field.column)}'
+            for field in self.fields if not field.primary_key
+        )
+        conflict = f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {self.copy_table} ({columns}) FROM STDIN '
+                f"WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                buffer
+            )
+            self.drop_unique_conflicts(cursor)
+            # xmax = 0 только у вставленных, а не обновлённых строк
+            cursor.execute(
+                f'INSERT INTO {quote(self.model._meta.db_table)} ({columns}) '
+                f'SELECT {columns} FROM {self.copy_table} '
+                f'ON CONFLICT ({pk}) {conflict} RETURNING (xmax = 0)'
+            )
+            inserted = [created for created, in cursor.fetchall()]
+            cursor.execute(f'TRUNCATE {self.copy_table}')
+        return sum(inserted), len(inserted) - sum(inserted)
+
+
+def reset_sequences(models):
+    # после вставки явных id счётчики PostgreSQL отстают от данных
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def finish_import(models, stdout):
+    reset_sequences(models)
+    # bulk-операции не вызывают сигналы: агрегаты оценок и кэши
+    # обновляются после загрузки
+    call_command('recalculate_ratings', stdout=stdout)
+    invalidate_all()
+
+
+def format_stats(name, stats):
+    rate = stats['rows'] / stats['seconds'] if stats['seconds'] else 0
+    return (
+        f'{name}: {stats["rows"]} строк, создано {stats["created"]}, '
+        f'обновлено {stats["updated"]}, пропущено {stats["skipped"]}, '
+        f'{rate:.0f} строк/с'
+    )
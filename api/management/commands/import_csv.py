@@ -0,0 +1,69 @@
+import csv
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.importing import TABLES, Importer, finish_import, format_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает данные из CSV-файлов каталога data с обновлением '
+        'существующих записей по id'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=Path(settings.BASE_DIR) / 'data',
+            type=Path,
+            help='каталог с файлами users.csv, category.csv и т.д.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            default=1000,
+            type=int,
+            help='количество строк в одной пачке'
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=[name for name, _, _ in TABLES],
+            help='загрузить только перечисленные файлы'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть положительным')
+        tables = [
+            table for table in TABLES
+            if not options['only'] or table[0] in options['only']
+        ]
+        missing = [
+            f'{name}.csv' for name, _, _ in tables
+            if not (options['path'] / f'{name}.csv').exists()
+        ]
+        if missing:
+            raise CommandError(f'Нет файлов: {", ".join(missing)}')
+        # как и в import_xlsx, файлы загружаются одной транзакцией:
+        # при ошибке в любом из них в базе не остаётся части данных
+        # без пересчитанных агрегатов и сброшенных кэшей
+        with transaction.atomic():
+            for name, model, renames in tables:
+                self.stdout.write(format_stats(
+                    name, self.load_file(options['path'], name, model,
+                                         renames, options['batch_size'])
+                ))
+            finish_import([model for _, model, _ in tables], self.stdout)
+
+    def load_file(self, path, name, model, renames, batch_size):
+        with open(path / f'{name}.csv', encoding='utf-8', newline='') as file:
+            rows = csv.reader(file)
+            importer = Importer(model, next(rows), renames, batch_size)
+            try:
+                return importer.load(rows)
+            except ValidationError as error:
+                raise CommandError(f'{name}.csv: {error.messages[0]}')
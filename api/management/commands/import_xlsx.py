@@ -0,0 +1,82 @@
+from itertools import takewhile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.importing import TABLES, Importer, finish_import, format_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает каталог из книги XLSX вида data/YaMDb.xlsx: листы '
+        'читаются потоково, записи обновляются по id'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=Path(settings.BASE_DIR) / 'data' / 'YaMDb.xlsx',
+            type=Path,
+            help='файл XLSX, по умолчанию data/YaMDb.xlsx'
+        )
+        parser.add_argument(
+            '--batch-size',
+            default=1000,
+            type=int,
+            help='количество строк в одной пачке'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='проверить книгу загрузкой в транзакцию и откатить её'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise CommandError('Для импорта XLSX установите пакет openpyxl')
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть положительным')
+        if not options['path'].exists():
+            raise CommandError(f'Нет файла {options["path"]}')
+        # read_only: строки читаются из архива по мере обхода
+        workbook = load_workbook(options['path'], read_only=True)
+        try:
+            sheets = {sheet.title.lower(): sheet for sheet in workbook}
+            tables = [table for table in TABLES if table[0] in sheets]
+            with transaction.atomic():
+                for name, model, renames in tables:
+                    stats = self.load_sheet(
+                        sheets[name], model, renames, options['batch_size']
+                    )
+                    self.stdout.write(
+                        format_stats(sheets[name].title, stats)
+                    )
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+                    self.stdout.write(self.style.SUCCESS(
+                        'Проверка завершена, изменения отменены'
+                    ))
+                    return
+                finish_import([model for _, model, _ in tables], self.stdout)
+        finally:
+            workbook.close()
+
+    def load_sheet(self, sheet, model, renames, batch_size):
+        rows = sheet.iter_rows(values_only=True)
+        # у листа бывают пустые столбцы справа и пустые строки
+        header = list(takewhile(lambda name: name is not None, next(rows)))
+        rows = (
+            row[:len(header)] for row in rows
+            if any(value is not None for value in row)
+        )
+        importer = Importer(model, header, renames, batch_size)
+        try:
+            return importer.load(rows)
+        except ValidationError as error:
+            raise CommandError(f'Лист {sheet.title}: {error.messages[0]}')
@@ -0,0 +1,106 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import (Count, F, IntegerField, OuterRef, Q, Subquery,
+                              Sum, Value)
+from django.db.models.functions import Coalesce
+
+from api.cache import bump_version
+from api.models import SCORES, Review, Title, TitleStats, rating_expression
+
+
+def review_subquery(aggregate, outer='pk', **filters):
+    reviews = (
+        Review.objects.filter(title=OuterRef(outer), **filters)
+        .order_by()
+        .values('title')
+        .annotate(total=aggregate)
+        .values('total')
+    )
+    return Coalesce(
+        Subquery(reviews, output_field=IntegerField()), Value(0)
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает сумму и количество оценок, рейтинг '
+        'и распределение оценок произведений'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='только проверить агрегаты, ничего не изменяя'
+        )
+
+    def get_mismatched(self):
+        histogram = Q()
+        for score in SCORES:
+            histogram |= ~Q(**{
+                f'actual_{score}': Coalesce(F(f'stats__score_{score}'), 0)
+            })
+        return Title.objects.annotate(
+            actual_sum=review_subquery(Sum('score')),
+            actual_count=review_subquery(Count('pk')),
+            **{
+                f'actual_{score}': review_subquery(Count('pk'), score=score)
+                for score in SCORES
+            }
+        ).filter(
+            histogram
+            | ~Q(score_sum=F('actual_sum'))
+            | ~Q(score_count=F('actual_count'))
+            | Q(score_count=0, rating__isnull=False)
+            | (
+                Q(score_count__gt=0)
+                & (
+                    Q(rating__isnull=True)
+                    | ~Q(rating=rating_expression(
+                        F('score_sum'), F('score_count')
+                    ))
+                )
+            )
+        )
+
+    def handle(self, *args, **options):
+        mismatched = list(
+            self.get_mismatched().values_list('pk', flat=True)
+        )
+        if options['check']:
+            if mismatched:
+                raise CommandError(
+                    f'Агрегаты оценок не совпадают у {len(mismatched)} '
+                    f'произведений: {mismatched[:20]}'
+                )
+            self.stdout.write(self.style.SUCCESS('Агрегаты оценок верны'))
+            return
+        with transaction.atomic():
+            Title.objects.update(
+                score_sum=review_subquery(Sum('score')),
+                score_count=review_subquery(Count('pk')),
+            )
+            Title.objects.filter(score_count=0).update(rating=None)
+            Title.objects.filter(score_count__gt=0).update(
+                rating=rating_expression(F('score_sum'), F('score_count'))
+            )
+            TitleStats.objects.bulk_create(
+                [
+                    TitleStats(title_id=title_id)
+                    for title_id in Title.objects.filter(
+                        score_count__gt=0, stats__isnull=True
+                    ).values_list('pk', flat=True).iterator()
+                ],
+                batch_size=1000
+            )
+            TitleStats.objects.update(**{
+                f'score_{score}': review_subquery(
+                    Count('pk'), outer='title', score=score
+                )
+                for score in SCORES
+            })
+        bump_version('reviews', *(f'title:{pk}' for pk in mismatched))
+        self.stdout.write(self.style.SUCCESS(
+            f'Агрегаты пересчитаны, исправлено произведений: '
+            f'{len(mismatched)}'
+        ))
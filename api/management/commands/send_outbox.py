@@ -0,0 +1,51 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.outbox import OutboxSender
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет письма из outbox пачками через одно соединение '
+        'с почтовым сервером, неудачные повторяет с нарастающей задержкой'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='отправить готовые к отправке письма и завершиться'
+        )
+        parser.add_argument(
+            '--batch-size',
+            default=settings.OUTBOX['BATCH_SIZE'],
+            type=int,
+            help='количество писем в одной пачке'
+        )
+        parser.add_argument(
+            '--interval',
+            default=settings.OUTBOX['POLL_INTERVAL'],
+            type=float,
+            help='пауза между проверками пустого outbox, секунды'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть положительным')
+        sender = OutboxSender(BATCH_SIZE=options['batch_size'])
+        try:
+            while True:
+                sender.drain()
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sender.close()
+        self.stdout.write(
+            'Отправлено: {sent}, отложено: {retried}, '
+            'не отправлено: {failed}'.format(**sender.stats)
+        )
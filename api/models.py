@@ -3,12 +3,15 @@ from datetime import datetime as dt
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, ExpressionWrapper, F, Value, When
 from django.db.models.deletion import CASCADE
+from django.utils import timezone
 
 CURRENT_YEAR = dt.now().year
 MESSAGE_MIN = 'Значение должно быть не ниже %(limit_value)s.'
 MESSAGE_MAX = 'Значение должно быть не выше %(limit_value)s.'
+SCORES = range(1, 11)
 
 
 class Role(models.TextChoices):
@@ -93,6 +96,10 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.slug = self.slug.lower()
+        super().save(*args, **kwargs)
+
 
 class Genre(models.Model):
     name = models.CharField(
@@ -114,6 +121,10 @@ class Genre(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.slug = self.slug.lower()
+        super().save(*args, **kwargs)
+
 
 class Title(models.Model):
     name = models.CharField(
@@ -135,7 +146,7 @@ class Title(models.Model):
         Genre,
         verbose_name='жанр',
         blank=True,
-        db_index=True,
+        through='GenreTitle',
         related_name='titles'
     )
     category = models.ForeignKey(
@@ -147,16 +158,142 @@ class Title(models.Model):
         db_index=True,
         related_name='titles'
     )
+    # агрегаты оценок поддерживаются при записи отзывов,
+    # чтобы список произведений не считал Avg по всей таблице отзывов
+    score_sum = models.PositiveIntegerField(
+        verbose_name='сумма оценок',
+        default=0,
+        editable=False
+    )
+    score_count = models.PositiveIntegerField(
+        verbose_name='количество оценок',
+        default=0,
+        editable=False
+    )
+    rating = models.PositiveSmallIntegerField(
+        verbose_name='рейтинг',
+        null=True,
+        blank=True,
+        editable=False
+    )
 
     class Meta:
         # сортировку добавил во вьюсете
         verbose_name = 'произведение'
         verbose_name_plural = 'произведения'
+        indexes = [
+            models.Index(
+                fields=['category', 'year'],
+                name='title_category_year_idx'
+            )
+        ]
 
     def __str__(self):
         return self.name
 
 
+class GenreTitle(models.Model):
+    # явная промежуточная таблица ради индекса (genre, title)
+    # для фильтра произведений по жанру
+    title = models.ForeignKey(
+        Title,
+        on_delete=CASCADE,
+        verbose_name='произведение'
+    )
+    genre = models.ForeignKey(
+        Genre,
+        on_delete=CASCADE,
+        verbose_name='жанр'
+    )
+
+    class Meta:
+        db_table = 'api_title_genre'
+        verbose_name = 'жанр произведения'
+        verbose_name_plural = 'жанры произведений'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'genre'],
+                name='unique_genre_title'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['genre', 'title'], name='genre_title_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.title_id} {self.genre_id}'
+
+
+def rating_expression(score_sum, score_count):
+    # целочисленное деление повторяет прежнее поведение int(Avg(...))
+    return ExpressionWrapper(
+        score_sum / score_count,
+        output_field=models.PositiveSmallIntegerField()
+    )
+
+
+def update_title_scores(title_id, sum_delta, count_delta):
+    if title_id is None or (sum_delta == 0 and count_delta == 0):
+        return
+    new_sum = F('score_sum') + sum_delta
+    new_count = F('score_count') + count_delta
+    Title.objects.filter(pk=title_id).update(
+        score_sum=new_sum,
+        score_count=new_count,
+        rating=Case(
+            When(score_count=-count_delta, then=Value(None)),
+            default=rating_expression(new_sum, new_count)
+        )
+    )
+
+
+class TitleStats(models.Model):
+    title = models.OneToOneField(
+        Title,
+        on_delete=CASCADE,
+        primary_key=True,
+        verbose_name='произведение',
+        related_name='stats'
+    )
+
+    class Meta:
+        verbose_name = 'распределение оценок'
+        verbose_name_plural = 'распределения оценок'
+
+    def __str__(self):
+        return str(self.title_id)
+
+    def get_scores(self):
+        return {score: getattr(self, f'score_{score}') for score in SCORES}
+
+
+# по колонке на каждую оценку: score_1 ... score_10
+for score in SCORES:
+    TitleStats.add_to_class(
+        f'score_{score}',
+        models.PositiveIntegerField(f'оценок {score}', default=0)
+    )
+
+
+def update_title_stats(title_id, old_score=None, new_score=None):
+    if title_id is None or old_score == new_score:
+        return
+    changes = {}
+    if old_score is not None:
+        changes[f'score_{old_score}'] = F(f'score_{old_score}') - 1
+    if new_score is not None:
+        changes[f'score_{new_score}'] = F(f'score_{new_score}') + 1
+    stats = TitleStats.objects.filter(title_id=title_id)
+    if not stats.update(**changes) and old_score is None:
+        # строка распределения создаётся при первом отзыве
+        TitleStats.objects.get_or_create(title_id=title_id)
+        stats.update(**changes)
+
+
+# снимок оценки отзыва, загруженного без title_id или score
+UNKNOWN_SCORE = object()
+
+
 class Review(models.Model):
     title = models.ForeignKey(
         Title,
@@ -188,6 +325,13 @@ class Review(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'отзыв'
         verbose_name_plural = 'отзывы'
+        # под ORDER BY -pub_date, -id курсорной пагинации отзывов
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date', 'id'],
+                name='review_title_pub_date_idx'
+            )
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['title', 'author'],
@@ -200,6 +344,31 @@ class Review(models.Model):
             return self.text + '...'
         return self.text
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # запоминаем загруженную оценку, чтобы при сохранении
+        # применить к произведению только разницу; при only()/defer()
+        # оценки нет, и прежние значения читаются из базы в load_scored
+        if instance.get_deferred_fields().isdisjoint(('title_id', 'score')):
+            instance._scored = (instance.title_id, instance.score)
+        else:
+            instance._scored = UNKNOWN_SCORE
+        return instance
+
+    def load_scored(self):
+        if getattr(self, '_scored', None) is UNKNOWN_SCORE:
+            self._scored = Review.objects.filter(pk=self.pk).values_list(
+                'title_id', 'score'
+            ).first() or (None, None)
+
+    def save(self, *args, **kwargs):
+        # отзыв и агрегаты произведения меняются в одной транзакции,
+        # сами агрегаты обновляет обработчик post_save в signals.py
+        with transaction.atomic(using=kwargs.get('using')):
+            self.load_scored()
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     review = models.ForeignKey(
@@ -226,8 +395,64 @@ class Comment(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date', 'id'],
+                name='comment_review_pub_date_idx'
+            )
+        ]
 
     def __str__(self):
         if len(self.text) > 30:
             return self.text + '...'
         return self.text
+
+
+class OutboxStatus(models.TextChoices):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+
+class OutboxMessage(models.Model):
+    # письмо записывается в одной транзакции с запросом, а отправляет
+    # его команда send_outbox: медленный SMTP не держит воркер API
+    subject = models.CharField('тема', max_length=200)
+    body = models.TextField('текст')
+    from_email = models.CharField(
+        'отправитель',
+        max_length=200,
+        null=True,
+        blank=True
+    )
+    to = models.EmailField('получатель', max_length=200)
+    status = models.CharField(
+        'статус',
+        max_length=10,
+        choices=OutboxStatus.choices,
+        default=OutboxStatus.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('попыток', default=0)
+    next_attempt_at = models.DateTimeField(
+        'следующая попытка',
+        default=timezone.now
+    )
+    last_error = models.TextField('последняя ошибка', blank=True)
+    created = models.DateTimeField('создано', auto_now_add=True)
+    sent = models.DateTimeField('отправлено', null=True, blank=True)
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'исходящее письмо'
+        verbose_name_plural = 'исходящие письма'
+        # выборка очередной пачки: WHERE status = 'pending'
+        # AND next_attempt_at <= now ORDER BY id
+        indexes = [
+            models.Index(
+                fields=['status', 'next_attempt_at'],
+                name='outbox_status_next_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.to}: {self.subject}'
@@ -0,0 +1,109 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxMessage, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = ('status', 'attempts', 'next_attempt_at', 'last_error', 'sent')
+
+
+def enqueue_mail(subject, body, to, from_email=None):
+    return OutboxMessage.objects.create(
+        subject=subject, body=body, to=to, from_email=from_email
+    )
+
+
+class OutboxSender:
+    """Отправляет письма из outbox пачками через одно SMTP-соединение.
+
+    Пачка закрепляется за воркером на LEASE секунд коротким запросом
+    SELECT ... FOR UPDATE SKIP LOCKED, письма отправляются вне
+    транзакции, результаты записываются одним bulk_update. Если воркер
+    упадёт посреди пачки, её письма возьмут снова по истечении LEASE.
+    """
+
+    def __init__(self, connection=None, **options):
+        config = {**settings.OUTBOX, **options}
+        self.batch_size = config['BATCH_SIZE']
+        self.max_attempts = config['MAX_ATTEMPTS']
+        self.backoff = config['BACKOFF']
+        self.max_backoff = config['MAX_BACKOFF']
+        self.lease = config['LEASE']
+        self.connection = connection or get_connection(fail_silently=False)
+        self.stats = {'sent': 0, 'retried': 0, 'failed': 0}
+
+    def claim(self):
+        now = timezone.now()
+        with transaction.atomic():
+            messages = list(
+                OutboxMessage.objects.select_for_update(skip_locked=True)
+                .filter(status=OutboxStatus.PENDING, next_attempt_at__lte=now)
+                .order_by('id')[:self.batch_size]
+            )
+            if messages:
+                OutboxMessage.objects.filter(
+                    pk__in=[message.pk for message in messages]
+                ).update(next_attempt_at=now + timedelta(seconds=self.lease))
+        return messages
+
+    def get_delay(self, attempts):
+        return min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+
+    def send(self, message):
+        message.attempts += 1
+        try:
+            # открытое соединение open() не пересоздаёт
+            self.connection.open()
+            self.connection.send_messages([EmailMessage(
+                message.subject, message.body, message.from_email,
+                [message.to], connection=self.connection
+            )])
+        except Exception as error:
+            logger.warning(
+                'Письмо %s не отправлено (попытка %s): %s',
+                message.pk, message.attempts, error
+            )
+            self.close()
+            message.last_error = repr(error)
+            if message.attempts >= self.max_attempts:
+                message.status = OutboxStatus.FAILED
+                self.stats['failed'] += 1
+            else:
+                message.next_attempt_at = timezone.now() + timedelta(
+                    seconds=self.get_delay(message.attempts)
+                )
+                self.stats['retried'] += 1
+            return
+        message.status = OutboxStatus.SENT
+        message.sent = timezone.now()
+        message.last_error = ''
+        self.stats['sent'] += 1
+
+    def send_batch(self):
+        messages = self.claim()
+        for message in messages:
+            self.send(message)
+        if messages:
+            OutboxMessage.objects.bulk_update(messages, RESULT_FIELDS)
+        return len(messages)
+
+    def drain(self):
+        # до пустой выборки: письма с отложенной попыткой дождутся
+        # следующего запуска
+        while self.send_batch():
+            pass
+        return self.stats
+
+    def close(self):
+        # после ошибки соединение могло оборваться - следующее письмо
+        # откроет новое
+        try:
+            self.connection.close()
+        except Exception:
+            logger.exception('Не удалось закрыть соединение с сервером')
@@ -1,6 +1,164 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+from functools import partial
+
+from django.core.cache import cache
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connection
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import get_version, make_key
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+
+class PubDateCursorPagination(CursorPagination):
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class NestedPagination(CustomPagination):
+    # ?cursor=... или ?pagination=cursor переключают на курсорную пагинацию:
+    # глубокие страницы стоят столько же, сколько первая
+    cursor_class = PubDateCursorPagination
+
+    def use_cursor(self, request):
+        return (
+            self.cursor_class.cursor_query_param in request.query_params
+            or request.query_params.get('pagination') == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.delegate = None
+        if self.use_cursor(request):
+            self.delegate = self.cursor_class()
+            return self.delegate.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.delegate is not None:
+            return self.delegate.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class KnownCountPaginator(DjangoPaginator):
+
+    def __init__(self, *args, count, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count = count
+
+
+class TitlePagination(CustomPagination):
+    # ?count=exact - точный COUNT на каждый запрос;
+    # ?count=none - без COUNT, наличие следующей страницы по лишней строке;
+    # ?count=estimate - оценка планировщика Postgres для выборки без фильтров;
+    # по умолчанию COUNT кэшируется по параметрам фильтрации
+    # до следующей записи в произведения
+    count_query_param = 'count'
+    count_modes = ('cached', 'exact', 'none', 'estimate')
+    count_cache_timeout = 300
+    version_name = 'titles'
+
+    def get_count_mode(self, request):
+        mode = request.query_params.get(self.count_query_param, 'cached')
+        if mode not in self.count_modes:
+            raise ValidationError({
+                self.count_query_param: (
+                    f'Допустимые значения: {", ".join(self.count_modes)}'
+                )
+            })
+        return mode
+
+    def get_filter_params(self, request):
+        skip = {
+            self.page_query_param, self.page_size_query_param,
+            self.count_query_param
+        }
+        return sorted(
+            (key, value) for key, values in request.query_params.lists()
+            if key not in skip for value in values
+        )
+
+    def get_cached_count(self, queryset, request):
+        key = make_key(
+            'count', get_version(self.version_name),
+            self.get_filter_params(request)
+        )
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def get_estimated_count(self, queryset, request):
+        if (connection.vendor != 'postgresql'
+                or self.get_filter_params(request)):
+            return self.get_cached_count(queryset, request)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < 0:
+            return self.get_cached_count(queryset, request)
+        return row[0]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_mode = self.get_count_mode(request)
+        if self.count_mode == 'exact':
+            return super().paginate_queryset(queryset, request, view)
+        if self.count_mode == 'none':
+            return self.paginate_without_count(queryset, request)
+        if self.count_mode == 'estimate':
+            count = self.get_estimated_count(queryset, request)
+        else:
+            count = self.get_cached_count(queryset, request)
+        self.django_paginator_class = partial(KnownCountPaginator, count=count)
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_without_count(self, queryset, request):
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = int(
+                request.query_params.get(self.page_query_param, 1)
+            )
+            if self.page_number < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=request.query_params.get(self.page_query_param),
+                message='Номер страницы должен быть целым положительным'
+            ))
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.request = request
+        return rows[:page_size]
+
+    def get_paginated_response(self, data):
+        if self.count_mode != 'none':
+            return super().get_paginated_response(data)
+        url = self.request.build_absolute_uri()
+        next_link = previous_link = None
+        if self.has_next:
+            next_link = replace_query_param(
+                url, self.page_query_param, self.page_number + 1
+            )
+        if self.page_number == 2:
+            previous_link = remove_query_param(url, self.page_query_param)
+        elif self.page_number > 2:
+            previous_link = replace_query_param(
+                url, self.page_query_param, self.page_number - 1
+            )
+        return Response(OrderedDict([
+            ('next', next_link),
+            ('previous', previous_link),
+            ('results', data)
+        ]))
@@ -0,0 +1,159 @@
+from django.db import connections
+
+from .models import Title
+
+# порог по умолчанию pg_trgm.similarity_threshold для оператора %
+SIMILARITY_THRESHOLD = 0.3
+TABLE = Title._meta.db_table
+FTS_TABLE = f'{TABLE}_fts'
+# выражение должно совпадать с индексом, иначе Postgres его не использует
+PG_DOCUMENT = (
+    f"to_tsvector('simple', coalesce({TABLE}.name, '') || ' ' "
+    f"|| coalesce({TABLE}.description, ''))"
+)
+
+POSTGRES_SETUP = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f'CREATE INDEX IF NOT EXISTS title_search_document_idx '
+    f'ON {TABLE} USING gin ({PG_DOCUMENT})',
+    f'CREATE INDEX IF NOT EXISTS title_name_trgm_idx '
+    f'ON {TABLE} USING gin (name gin_trgm_ops)',
+)
+
+# внешнее содержимое FTS5 берётся из таблицы произведений,
+# индекс поддерживают триггеры, поэтому сигналы Django не нужны
+SQLITE_SETUP = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"name, description, content='{TABLE}', content_rowid='id', "
+    f"tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT "
+    f"ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, description) "
+    f"VALUES (new.id, new.name, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE "
+    f"ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) "
+    f"VALUES ('delete', old.id, old.name, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE "
+    f"OF name, description ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) "
+    f"VALUES ('delete', old.id, old.name, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, description) "
+    f"VALUES (new.id, new.name, new.description); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+
+# токенизатор trigram есть в FTS5 начиная с SQLite 3.34
+SQLITE_TRIGRAM_VERSION = (3, 34, 0)
+
+
+def has_trigram_fts(connection):
+    return (
+        connection.vendor == 'sqlite'
+        and connection.Database.sqlite_version_info >= SQLITE_TRIGRAM_VERSION
+    )
+
+
+def setup_search(using='default'):
+    connection = connections[using]
+    statements = ()
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_SETUP
+    elif has_trigram_fts(connection):
+        statements = SQLITE_SETUP
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def trigrams(value):
+    value = ' '.join(value.lower().split())
+    return list(dict.fromkeys(
+        value[start:start + 3] for start in range(len(value) - 2)
+    ))
+
+
+def similarity(left, right):
+    # то же, что similarity() из pg_trgm: слова дополняются пробелами,
+    # сходство - доля общих триграмм в объединении
+    def word_trigrams(value):
+        grams = set()
+        for word in (value or '').lower().split():
+            word = f'  {word} '
+            grams.update(word[i:i + 3] for i in range(len(word) - 2))
+        return grams
+    left, right = word_trigrams(left), word_trigrams(right)
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def register_functions(connection):
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(
+            'similarity', 2, similarity, deterministic=True
+        )
+
+
+def quote(value):
+    return '"{}"'.format(value.replace('"', '""'))
+
+
+def search_postgres(queryset, query):
+    return queryset.extra(
+        select={
+            'search_similarity': f'similarity({TABLE}.name, %s)',
+            'search_rank': (
+                f"ts_rank({PG_DOCUMENT}, plainto_tsquery('simple', %s))"
+            ),
+        },
+        select_params=(query, query),
+        where=[
+            f"({PG_DOCUMENT} @@ plainto_tsquery('simple', %s) "
+            f"OR {TABLE}.name %% %s)"
+        ],
+        params=(query, query),
+    ).order_by('-search_similarity', '-search_rank', 'id')
+
+
+def search_sqlite(queryset, query):
+    grams = trigrams(query)
+    if not grams:
+        # триграммный индекс не ищет строки короче трёх символов
+        return queryset.filter(name__icontains=query)
+    # FTS5 отбирает кандидатов по любой общей триграмме, дальше как в
+    # Postgres: похожее название (similarity() из pg_trgm) или вхождение
+    # запроса в текст; порядок по similarity и bm25 вместо ts_rank
+    match = ' OR '.join(quote(gram) for gram in grams)
+    return queryset.extra(
+        select={
+            'search_similarity': f'similarity({TABLE}.name, %s)',
+            'search_rank': (
+                f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = {TABLE}.id'
+            ),
+        },
+        select_params=(query, match),
+        where=[
+            f'{TABLE}.id IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)',
+            f'(similarity({TABLE}.name, %s) >= %s '
+            f'OR {TABLE}.id IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s))',
+        ],
+        params=(match, query, SIMILARITY_THRESHOLD, quote(query)),
+    ).order_by('-search_similarity', '-search_rank', 'id')
+
+
+def search_titles(queryset, query):
+    query = query.strip()
+    if not query:
+        return queryset
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        return search_postgres(queryset, query)
+    if has_trigram_fts(connection):
+        return search_sqlite(queryset, query)
+    # на старом SQLite индекса поиска нет
+    return queryset.filter(name__icontains=query)
@@ -1,6 +1,43 @@
-from rest_framework import serializers
+from collections import Counter, OrderedDict
+from operator import itemgetter
 
-from .models import Category, Comment, Genre, Review, Title, User
+from django.db import connection, transaction
+from django.db.models import Exists, Max, OuterRef
+from django.http import Http404
+from rest_framework import permissions, serializers
+from rest_framework.validators import UniqueValidator
+
+from .autocomplete import changed as autocomplete_changed
+from .cache import SlugCache, titles_saved
+from .models import (SCORES, Category, Comment, Genre, GenreTitle, Review,
+                     Title, User)
+
+
+def get_field_list(request, param):
+    value = request.query_params.get(param, '')
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def is_field_requested(request, name):
+    # ?fields= оставляет только перечисленные поля, ?omit= убирает поля;
+    # работает только на чтение
+    if request is None or request.method not in permissions.SAFE_METHODS:
+        return True
+    fields = get_field_list(request, 'fields')
+    return (
+        (not fields or name in fields)
+        and name not in get_field_list(request, 'omit')
+    )
+
+
+class SparseFieldsMixin:
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        for name in list(self.fields):
+            if not is_field_requested(request, name):
+                self.fields.pop(name)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -21,7 +58,7 @@ class NewUserSerializer(serializers.ModelSerializer):
         fields = ('email',)
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username',
@@ -41,15 +78,20 @@ class ReviewSerializer(serializers.ModelSerializer):
         title = request_context.parser_context['kwargs']['title_id']
         author = request_context.user
         message = 'Вы уже оставляли отзыв на данное произведение'
-        check_exists = (
-            Review.objects.filter(title=title, author=author).exists()
-        )
-        if check_exists:
+        # существование произведения и повторный отзыв - одним запросом
+        reviewed = Title.objects.filter(pk=title).annotate(
+            reviewed=Exists(
+                Review.objects.filter(title=OuterRef('pk'), author=author)
+            )
+        ).values_list('reviewed', flat=True).first()
+        if reviewed is None:
+            raise Http404
+        if reviewed:
             raise serializers.ValidationError(message)
         return data
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username'
@@ -60,43 +102,368 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
 
 
+def unique_slug_validator(queryset):
+    # slug приводится к нижнему регистру в save() модели, поэтому
+    # уникальность проверяется без учёта регистра
+    return UniqueValidator(queryset=queryset, lookup='iexact')
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         fields = ('name', 'slug')
         model = Category
+        extra_kwargs = {'slug': {'validators': [
+            unique_slug_validator(Category.objects.all())
+        ]}}
 
 
 class GenreSerializer(serializers.ModelSerializer):
     class Meta:
         fields = ('name', 'slug')
         model = Genre
+        extra_kwargs = {'slug': {'validators': [
+            unique_slug_validator(Genre.objects.all())
+        ]}}
 
 
-class TitleListSerializer(serializers.ModelSerializer):
+class TitleListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category = CategorySerializer(many=False, read_only=True)
     genre = GenreSerializer(many=True, read_only=True)
     rating = serializers.IntegerField(read_only=True)
 
     class Meta:
-        fields = '__all__'
+        fields = (
+            'id', 'category', 'genre', 'rating', 'name', 'year', 'description'
+        )
         model = Title
 
 
+class CachedSlugField(serializers.Field):
+    """Slug категории или жанра, разрешённый через SlugCache."""
+    default_error_messages = {
+        'does_not_exist': 'Объект со slug={value} не существует.',
+        'invalid': 'Некорректное значение.',
+    }
+
+    def __init__(self, slugs, **kwargs):
+        self.slugs = slugs
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            return self.resolve([data])[0]
+        except serializers.ValidationError as error:
+            raise serializers.ValidationError(error.detail[0])
+
+    def resolve(self, data):
+        objects = self.slugs.resolve(
+            slug for slug in data if isinstance(slug, str)
+        )
+        result, errors = [], OrderedDict()
+        for index, slug in enumerate(data):
+            try:
+                if not isinstance(slug, str):
+                    self.fail('invalid')
+                if slug not in objects:
+                    self.fail('does_not_exist', value=slug)
+                result.append(objects[slug])
+            except serializers.ValidationError as error:
+                errors[index] = error.detail
+        if errors:
+            raise serializers.ValidationError(errors)
+        return result
+
+    def to_representation(self, value):
+        return value.slug
+
+
+class CachedSlugListField(serializers.ListField):
+    """Список slug, разрешаемый одним обращением к SlugCache."""
+
+    def run_child_validation(self, data):
+        return self.child.resolve(list(data))
+
+
+category_slugs = SlugCache(Category, 'categories')
+genre_slugs = SlugCache(Genre, 'genres')
+
+
+def represent_slug_object(obj):
+    return OrderedDict([('name', obj.name), ('slug', obj.slug)])
+
+
+def represent_title(title):
+    # совпадает с TitleListSerializer, но без вложенных сериализаторов
+    # и запросов: жанры уже лежат в title.genres
+    return OrderedDict([
+        ('id', title.pk),
+        ('category', (
+            title.category and represent_slug_object(title.category)
+        )),
+        ('genre', [represent_slug_object(genre) for genre in title.genres]),
+        ('rating', title.rating),
+        ('name', title.name),
+        ('year', title.year),
+        ('description', title.description),
+    ])
+
+
+def sort_genres(genres):
+    # порядок жанров в ответе такой же, как у TitleListSerializer
+    return sorted(set(genres), key=lambda genre: genre.slug)
+
+
 class TitlePostSerializer(serializers.ModelSerializer):
-    category = serializers.SlugRelatedField(
-        queryset=Category.objects.all(),
-        slug_field='slug',
-    )
-    genre = serializers.SlugRelatedField(
-        queryset=Genre.objects.all(),
-        slug_field='slug',
-        many=True,
-    )
+    # slug разрешаются через кэш в памяти: запись произведения стоит
+    # одинаковое число запросов при любом числе жанров
+    category = CachedSlugField(category_slugs)
+    genre = CachedSlugListField(child=CachedSlugField(genre_slugs))
     rating = serializers.IntegerField(read_only=True)
 
     class Meta:
-        fields = '__all__'
+        fields = (
+            'id', 'category', 'genre', 'rating', 'name', 'year', 'description'
+        )
         model = Title
 
+    def create(self, validated_data):
+        genres = sort_genres(validated_data.pop('genre', []))
+        with transaction.atomic():
+            title = Title.objects.create(**validated_data)
+            # у нового произведения нет связей: вставляем их одним
+            # запросом без выборки текущих, которую делает genre.set()
+            GenreTitle.objects.bulk_create(
+                GenreTitle(title=title, genre=genre) for genre in genres
+            )
+        title.genres = genres
+        return title
+
+    def update(self, instance, validated_data):
+        genres = validated_data.get('genre')
+        title = super().update(instance, validated_data)
+        title.genres = (
+            list(title.genre.all()) if genres is None
+            else sort_genres(genres)
+        )
+        return title
+
     def to_representation(self, instance):
-        return TitleListSerializer(instance).data
+        return represent_title(instance)
+
+
+class PreloadedSlugField(serializers.Field):
+    """Slug, разрешённый по словарю из контекста, без запроса к базе."""
+    default_error_messages = {
+        'does_not_exist': 'Объект со slug={value} не существует.',
+        'invalid': 'Некорректное значение.',
+    }
+
+    def __init__(self, objects_key, **kwargs):
+        self.objects_key = objects_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        obj = self.context[self.objects_key].get(data)
+        if obj is None:
+            self.fail('does_not_exist', value=data)
+        return obj
+
+    def to_representation(self, value):
+        return value.slug
+
+
+class TitleBulkListSerializer(serializers.ListSerializer):
+
+    def create(self, validated_data):
+        return save_titles(validated_data, self.context['titles'])
+
+
+class TitleBulkSerializer(serializers.ModelSerializer):
+    # категории, жанры и изменяемые произведения загружаются один раз
+    # на весь запрос, см. get_bulk_context
+    id = serializers.IntegerField(required=False)
+    category = PreloadedSlugField('categories')
+    genre = serializers.ListField(child=PreloadedSlugField('genres'))
+
+    class Meta:
+        fields = ('id', 'category', 'genre', 'name', 'year', 'description')
+        model = Title
+        list_serializer_class = TitleBulkListSerializer
+
+    def validate_id(self, value):
+        if value not in self.context['titles']:
+            raise serializers.ValidationError('Произведение не найдено')
+        if value in self.context['duplicate_ids']:
+            raise serializers.ValidationError(
+                'Произведение встречается в запросе несколько раз'
+            )
+        return value
+
+    def to_representation(self, instance):
+        return represent_title(instance)
+
+
+def get_bulk_context(items):
+    # slug разрешаются через SlugCache, изменяемые произведения - одним
+    # запросом
+    # некорректные значения здесь пропускаются, ошибки по ним вернёт
+    # валидация соответствующего элемента
+    items = [item for item in items if isinstance(item, dict)]
+    categories = {
+        item['category'] for item in items
+        if isinstance(item.get('category'), str)
+    }
+    genres = {
+        slug for item in items if isinstance(item.get('genre'), list)
+        for slug in item['genre'] if isinstance(slug, str)
+    }
+    ids = [item['id'] for item in items if isinstance(item.get('id'), int)]
+    return {
+        'categories': category_slugs.resolve(categories),
+        'genres': genre_slugs.resolve(genres),
+        'titles': Title.objects.in_bulk(ids) if ids else {},
+        'duplicate_ids': {
+            pk for pk, count in Counter(ids).items() if count > 1
+        },
+    }
+
+
+def save_titles(validated_data, existing):
+    new, changed = [], []
+    for item in validated_data:
+        genres = item.pop('genre')
+        title = existing.get(item.pop('id', None)) or Title()
+        for name, value in item.items():
+            setattr(title, name, value)
+        title.genres = sort_genres(genres)
+        (changed if title.pk else new).append(title)
+    with transaction.atomic():
+        Title.objects.bulk_create(new)
+        if new and not connection.features.can_return_rows_from_bulk_insert:
+            # SQLite не возвращает id из bulk_create. Блокировка записи
+            # держится с первой вставки до коммита, поэтому строки пачки
+            # получили подряд идущие id (AUTOINCREMENT не переиспользует
+            # удалённые), и последний из них - текущий max(id)
+            last = Title.objects.aggregate(Max('id'))['id__max']
+            for pk, title in enumerate(new, last - len(new) + 1):
+                title.pk = pk
+        if changed:
+            Title.objects.bulk_update(
+                changed, ['category', 'name', 'year', 'description']
+            )
+            GenreTitle.objects.filter(title__in=changed).delete()
+        titles = new + changed
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title_id=title.pk, genre_id=genre.pk)
+            for title in titles for genre in title.genres
+        )
+        # bulk-операции не вызывают сигналы: кэши сбрасываются явно
+        titles_saved([title.pk for title in titles])
+        autocomplete_changed('title', [title.pk for title in titles])
+    return titles
+
+
+class TitleStatsSerializer(serializers.ModelSerializer):
+    title = serializers.IntegerField(source='id')
+    count = serializers.IntegerField(source='score_count')
+    scores = serializers.SerializerMethodField()
+
+    class Meta:
+        fields = ('title', 'rating', 'count', 'scores')
+        model = Title
+
+    def get_scores(self, obj):
+        stats = getattr(obj, 'stats', None)
+        if stats is None:
+            return {str(score): 0 for score in SCORES}
+        return {
+            str(score): count for score, count in stats.get_scores().items()
+        }
+
+
+class ValuesListSerializer:
+    """Быстрый путь для списков: ответ из строк .values() без полей DRF.
+
+    Результат совпадает с ответом ModelSerializer байт в байт.
+    """
+    fields = ()
+    # колонки .values() для поля ответа, если они не совпадают с его именем
+    columns = {}
+    # колонки, нужные всегда: ключи связей и позиция курсора
+    extra_columns = ('id',)
+
+    def __init__(self, request=None):
+        self.fields = [
+            name for name in self.fields if is_field_requested(request, name)
+        ]
+
+    def get_columns(self):
+        columns = list(self.extra_columns)
+        for name in self.fields:
+            columns.extend(self.columns.get(name, (name,)))
+        return list(OrderedDict.fromkeys(columns))
+
+    def to_representation(self, rows):
+        getters = [
+            (name, getattr(self, f'represent_{name}', itemgetter(name)))
+            for name in self.fields
+        ]
+        return [
+            OrderedDict((name, getter(row)) for name, getter in getters)
+            for row in rows
+        ]
+
+
+PUB_DATE_FIELD = serializers.DateTimeField()
+
+
+def represent_pub_date(row):
+    return PUB_DATE_FIELD.to_representation(row['pub_date'])
+
+
+class TitleValuesSerializer(ValuesListSerializer):
+    fields = TitleListSerializer.Meta.fields
+    columns = {
+        'category': ('category__name', 'category__slug'),
+        'genre': (),
+    }
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        if 'genre' in self.fields:
+            self.genres = {}
+            relations = GenreTitle.objects.filter(
+                title_id__in=[row['id'] for row in rows]
+            ).order_by(*(
+                f'genre__{field}' for field in Genre._meta.ordering
+            )).values_list('title_id', 'genre__name', 'genre__slug')
+            for title_id, name, slug in relations:
+                self.genres.setdefault(title_id, []).append(
+                    OrderedDict([('name', name), ('slug', slug)])
+                )
+        return super().to_representation(rows)
+
+    def represent_category(self, row):
+        if row['category__slug'] is None:
+            return None
+        return OrderedDict([
+            ('name', row['category__name']),
+            ('slug', row['category__slug'])
+        ])
+
+    def represent_genre(self, row):
+        return self.genres.get(row['id'], [])
+
+
+class ReviewValuesSerializer(ValuesListSerializer):
+    fields = ('id', 'author', 'text', 'score', 'pub_date')
+    columns = {'author': ('author__username',)}
+    extra_columns = ('id', 'pub_date')
+    represent_author = staticmethod(itemgetter('author__username'))
+    represent_pub_date = staticmethod(represent_pub_date)
+
+
+class CommentValuesSerializer(ReviewValuesSerializer):
+    fields = ('id', 'author', 'text', 'pub_date')
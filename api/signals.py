@@ -0,0 +1,162 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save, pre_delete)
+from django.dispatch import receiver
+
+from .authentication import USER_SNAPSHOT_KEY
+from .autocomplete import KINDS
+from .autocomplete import index as autocomplete_index
+from .cache import (bump_title_versions_on_commit, bump_version_on_commit,
+                    invalidate_all)
+from .models import (Category, Genre, GenreTitle, Review, Title, User,
+                     update_title_scores, update_title_stats)
+from .search import register_functions, setup_search
+
+
+def invalidate_titles(*title_ids):
+    # после фиксации транзакции: иначе параллельный запрос успеет
+    # положить в кэш ещё не изменённую карточку под новой версией
+    bump_title_versions_on_commit(
+        {pk for pk in title_ids if pk is not None}
+    )
+
+
+def bump_rating_versions(*title_ids):
+    # рейтинг произведения изменился - ETag списка и карточки устарели
+    bump_version_on_commit('reviews', *(
+        f'title:{title_id}' for title_id in set(title_ids)
+        if title_id is not None
+    ))
+
+
+@receiver(post_save, sender=Review)
+def apply_review_score(sender, instance, **kwargs):
+    old_title_id, old_score = getattr(instance, '_scored', (None, None))
+    new_title_id, new_score = instance.title_id, instance.score
+    if old_title_id == new_title_id:
+        update_title_scores(
+            new_title_id, new_score - (old_score or 0), int(old_score is None)
+        )
+        update_title_stats(new_title_id, old_score, new_score)
+    else:
+        # отзыв перенесли на другое произведение (возможно только в админке)
+        update_title_scores(old_title_id, -(old_score or 0), -1)
+        update_title_scores(new_title_id, new_score, 1)
+        update_title_stats(old_title_id, old_score=old_score)
+        update_title_stats(new_title_id, new_score=new_score)
+    instance._scored = (new_title_id, new_score)
+    bump_rating_versions(old_title_id, new_title_id)
+
+
+@receiver(pre_delete, sender=Review)
+def load_review_score(sender, instance, **kwargs):
+    # после удаления отложенные поля уже не загрузить
+    instance.load_scored()
+
+
+@receiver(post_delete, sender=Review)
+def revert_review_score(sender, instance, **kwargs):
+    scored = getattr(instance, '_scored', None)
+    title_id, score = scored or (instance.title_id, instance.score)
+    if score is not None:
+        update_title_scores(title_id, -score, -1)
+        update_title_stats(title_id, old_score=score)
+        bump_rating_versions(title_id)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def bump_title_versions(sender, instance, **kwargs):
+    # состав выборок произведений изменился - кэшированные count устарели
+    bump_version_on_commit('titles', f'title:{instance.pk}')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_versions(sender, **kwargs):
+    # SlugCache тоже мог загрузить ещё не изменённые строки до фиксации
+    bump_version_on_commit('titles', 'categories')
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def bump_genre_versions(sender, **kwargs):
+    # SlugCache тоже мог загрузить ещё не изменённые строки до фиксации
+    bump_version_on_commit('titles', 'genres')
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def invalidate_category_titles(sender, instance, created=False, **kwargs):
+    # до удаления: потом у произведений уже не будет ссылки на категорию
+    if created:
+        return
+    invalidate_titles(*Title.objects.filter(
+        category=instance
+    ).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def invalidate_genre_titles(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    invalidate_titles(*GenreTitle.objects.filter(
+        genre=instance
+    ).values_list('title_id', flat=True))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_title_genre_versions(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_version_on_commit('titles', f'title:{instance.pk}')
+    elif pk_set:
+        bump_version_on_commit('titles', *(f'title:{pk}' for pk in pk_set))
+    else:
+        # у жанра очистили произведения - затронутые id неизвестны
+        bump_version_on_commit('titles', 'genres')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    # смена роли или блокировка видна сразу, а не через REVALIDATE_TTL
+    cache.delete(USER_SNAPSHOT_KEY.format(instance.pk))
+
+
+@receiver(post_migrate)
+def create_search_indexes(sender, using, **kwargs):
+    # у приложения нет миграций: индексы поиска создаются после migrate;
+    # migrate и flush меняют данные в обход сигналов - сбрасываем кэши
+    if sender.name == 'api':
+        setup_search(using)
+        invalidate_all()
+
+
+@receiver(connection_created)
+def register_search_functions(sender, connection, **kwargs):
+    register_functions(connection)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+def add_to_autocomplete(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: autocomplete_index.add(KINDS[sender], instance)
+    )
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+def remove_from_autocomplete(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(
+        lambda: autocomplete_index.remove(KINDS[sender], pk)
+    )
@@ -0,0 +1,82 @@
+from rest_framework.throttling import (AnonRateThrottle, SimpleRateThrottle,
+                                       UserRateThrottle)
+
+
+class SlidingWindowMixin:
+    """Скользящее окно из двух счётчиков вместо списка отметок времени.
+
+    На клиента хранятся счётчики текущего и прошлого окна, прошлое
+    учитывается пропорционально тому, какая его часть ещё попадает
+    в скользящее окно. Счётчики меняются атомарным cache.incr, поэтому
+    при общем кэше лимит один на все воркеры. Стоимость запроса берётся
+    из get_throttle_cost или throttle_cost представления.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        cost = self.get_cost(request, view)
+        now = self.timer()
+        window = int(now // self.duration)
+        self.elapsed = now - window * self.duration
+        current_key = f'{self.key}:{window}'
+        # окно живёт два периода: следующее окно читает его как прошлое
+        self.cache.add(current_key, 0, self.duration * 2)
+        try:
+            self.current = self.cache.incr(current_key, cost)
+        except ValueError:
+            # ключ вытеснен между add и incr
+            self.cache.set(current_key, cost, self.duration * 2)
+            self.current = cost
+        self.previous = self.cache.get(f'{self.key}:{window - 1}', 0)
+        if self.estimate(self.current) <= self.num_requests:
+            return True
+        # отклонённый запрос не расходует лимит
+        self.cache.decr(current_key, cost)
+        self.current -= cost
+        self.cost = cost
+        return False
+
+    def get_cost(self, request, view):
+        get_throttle_cost = getattr(view, 'get_throttle_cost', None)
+        if get_throttle_cost is not None:
+            return get_throttle_cost()
+        return getattr(view, 'throttle_cost', 1)
+
+    def estimate(self, current):
+        weight = 1 - self.elapsed / self.duration
+        return self.previous * weight + current
+
+    def wait(self):
+        current = self.current + self.cost
+        remaining = self.duration - self.elapsed
+        if current > self.num_requests or not self.previous:
+            # в текущем окне места не будет до его конца
+            return remaining
+        # когда вклад прошлого окна уменьшится настолько, что запрос влезет
+        weight = (self.num_requests - current) / self.previous
+        return max(0, self.duration * (1 - weight) - self.elapsed)
+
+
+class AnonSlidingWindowThrottle(SlidingWindowMixin, AnonRateThrottle):
+    pass
+
+
+class UserSlidingWindowThrottle(SlidingWindowMixin, UserRateThrottle):
+    pass
+
+
+class AutocompleteThrottle(SlidingWindowMixin, SimpleRateThrottle):
+    # подсказки запрашиваются на каждое нажатие клавиши: свой короткий
+    # лимит, который не расходует общий суточный
+    scope = 'autocomplete'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -2,8 +2,9 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                    ReviewViewSet, TitleViewSet, UserViewSet, create_new_user,
-                    get_token)
+                    ReviewViewSet, TitleViewSet, UserViewSet, autocomplete,
+                    create_new_user, db_pool_metrics, export_titles,
+                    get_token, title_cache_metrics)
 
 router = DefaultRouter()
 router.register('titles', TitleViewSet, basename='titles')
@@ -27,6 +28,13 @@ urls_auth = [
 ]
 
 urlpatterns = [
+    path('v1/autocomplete/', autocomplete, name='autocomplete'),
+    path('v1/export/titles/', export_titles, name='export-titles'),
+    path('v1/metrics/db-pool/', db_pool_metrics, name='db-pool-metrics'),
+    path(
+        'v1/metrics/title-cache/', title_cache_metrics,
+        name='title-cache-metrics'
+    ),
     path('v1/', include(router.urls)),
     path('v1/auth/', include(urls_auth))
 ]
@@ -1,65 +1,217 @@
+from functools import partial
+
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework import filters, mixins, viewsets
-from rest_framework.decorators import action, api_view
+from rest_framework import filters, mixins, serializers, status, viewsets
+from rest_framework.decorators import (action, api_view, permission_classes,
+                                       throttle_classes)
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
-from rest_framework_simplejwt.tokens import RefreshToken
 
+from api_yamdb.db.pool import pool_stats
+
+from .authentication import get_full_user, get_tokens_for_user
+from .autocomplete import index as autocomplete_index
+from .cache import get_version, list_cache, make_key, title_cache
+from .export import OUTPUTS, iter_csv, iter_ndjson
 from .filters import TitleFilter
-from .models import Category, Genre, Review, Title, User
+from .pagination import NestedPagination, TitlePagination
+from .models import Category, Comment, Genre, Review, Title, User
+from .outbox import enqueue_mail
 from .permissions import (AdminOrReadOnly, AdminPermission,
                           IsAuthorModeratorAdminOrReadOnly)
 from .serializers import (
-    CategorySerializer, CommentSerializer, GenreSerializer, NewUserSerializer,
-    ReviewSerializer, TitleListSerializer, TitlePostSerializer, UserSerializer)
+    CategorySerializer, CommentSerializer, CommentValuesSerializer,
+    GenreSerializer, NewUserSerializer, ReviewSerializer,
+    ReviewValuesSerializer, TitleListSerializer, TitlePostSerializer,
+    TitleBulkSerializer, TitleStatsSerializer, TitleValuesSerializer,
+    UserSerializer, get_bulk_context, is_field_requested)
+from .throttling import AutocompleteThrottle
+
+MAX_BULK_IDS = 100
+MAX_BULK_TITLES = 10000
+MAX_AUTOCOMPLETE_LIMIT = 50
+# полнотекстовый поиск расходует лимит троттлинга быстрее обычных чтений
+SEARCH_THROTTLE_COST = 5
+
+
+class SparseFieldsQuerysetMixin:
+    # связи и тяжёлые поля, не запрошенные через ?fields=/?omit=,
+    # не загружаются из базы
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    deferred_fields = ()
+
+    def optimize_queryset(self, queryset):
+        requested = partial(is_field_requested, self.request)
+        select = [name for name in self.select_related_fields
+                  if requested(name)]
+        prefetch = [name for name in self.prefetch_related_fields
+                    if requested(name)]
+        defer = [name for name in self.deferred_fields
+                 if not requested(name)]
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if defer:
+            queryset = queryset.defer(*defer)
+        return queryset
+
+
+class ValuesListMixin:
+    # list собирается из .values() без ModelSerializer,
+    # см. ValuesListSerializer
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = self.values_serializer_class(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.prefetch_related(None).values(
+            *values_serializer.get_columns()
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                values_serializer.to_representation(page)
+            )
+        return Response(values_serializer.to_representation(queryset))
+
+
+class ConditionalGetMixin:
+    # ETag и Last-Modified строятся из версий, которые сигналы меняют
+    # при записи, поэтому 304 отдаётся без запросов к базе и сериализации
+    list_versions = ()
+    detail_versions = ()
+
+    def get_list_versions(self):
+        return self.list_versions
+
+    def get_detail_versions(self):
+        return [name.format(**self.kwargs) for name in self.detail_versions]
+
+    def conditional_response(self, versions, handler, request, *args,
+                             **kwargs):
+        values = [get_version(name) for name in versions]
+        # обработчик ключует по этим же версиям свой кэш, см. cached_retrieve
+        self.version_values = values
+        etag = quote_etag(make_key(
+            'etag', request.accepted_media_type, request.build_absolute_uri(),
+            *values
+        ).rsplit(':', 1)[-1])
+        last_modified = max(values) // 10 ** 9
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_list_versions(), super().list, request, *args, **kwargs
+        )
+
+
+class CachedListMixin:
+    # ответ списка живёт в кэше до записи: сигналы меняют версию из
+    # get_list_versions при любом изменении, в том числе из админки;
+    # одновременные промахи по одному ключу считаются один раз
+
+    def list(self, request, *args, **kwargs):
+        key = make_key(
+            'list', request.accepted_media_type, request.build_absolute_uri(),
+            *(get_version(name) for name in self.get_list_versions())
+        )
+        compute = super().list
+        data, status = list_cache.get_or_set(
+            key, lambda: compute(request, *args, **kwargs).data,
+            settings.LIST_CACHE_TIMEOUT, settings.CACHE_STALE_TIMEOUT
+        )
+        response = Response(data)
+        response['X-Cache'] = status
+        return response
 
 
-class ReviewViewSet(ModelViewSet):
+class NestedPaginationMixin:
+    # родитель проверяется отдельным запросом только для пустой страницы:
+    # непустая выборка сама доказывает его существование
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page:
+            self.get_parent()
+        return page
+
+
+class ReviewViewSet(NestedPaginationMixin, SparseFieldsQuerysetMixin,
+                    ValuesListMixin, ModelViewSet):
     serializer_class = ReviewSerializer
+    values_serializer_class = ReviewValuesSerializer
+    pagination_class = NestedPagination
+    select_related_fields = ('author',)
+    deferred_fields = ('text',)
     permission_classes = [
         IsAuthenticatedOrReadOnly,
         IsAuthorModeratorAdminOrReadOnly
     ]
 
-    def get_title(self):  # DRY function for extract 'id' from url and check
-        title = get_object_or_404(Title, id=self.kwargs['title_id'])
-        return title
+    def get_parent(self):
+        return get_object_or_404(Title, id=self.kwargs['title_id'])
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        return self.optimize_queryset(
+            Review.objects.filter(title_id=self.kwargs['title_id'])
+        )
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.get_title())
+        # существование произведения проверено в ReviewSerializer.validate
+        serializer.save(
+            author=self.request.user,
+            title_id=self.kwargs['title_id']
+        )
 
 
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(NestedPaginationMixin, SparseFieldsQuerysetMixin,
+                     ValuesListMixin, ModelViewSet):
     serializer_class = CommentSerializer
+    values_serializer_class = CommentValuesSerializer
+    pagination_class = NestedPagination
+    select_related_fields = ('author',)
+    deferred_fields = ('text',)
     permission_classes = [
         IsAuthenticatedOrReadOnly,
         IsAuthorModeratorAdminOrReadOnly
     ]
 
-    def get_review(self):  # DRY function
-        review = get_object_or_404(
-            Review, id=self.kwargs['review_id'],
-            title__id=self.kwargs['title_id']
+    def get_parent(self):
+        return get_object_or_404(
+            Review.objects.only('id'),
+            id=self.kwargs['review_id'],
+            title_id=self.kwargs['title_id']
         )
-        return review
 
     def get_queryset(self):
-        return self.get_review().comments.all()
+        return self.optimize_queryset(Comment.objects.filter(
+            review_id=self.kwargs['review_id'],
+            review__title_id=self.kwargs['title_id']
+        ))
 
     def perform_create(self, serializer):
         return serializer.save(
             author=self.request.user,
-            review=self.get_review()
+            review=self.get_parent()
         )
 
 
@@ -71,28 +223,115 @@ class MixinClass(mixins.ListModelMixin, mixins.CreateModelMixin,
     permission_classes = [IsAuthenticatedOrReadOnly, AdminOrReadOnly]
 
 
-class CategoryViewSet(MixinClass):
+class CategoryViewSet(ConditionalGetMixin, CachedListMixin, MixinClass):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    list_versions = ('categories',)
 
 
-class GenreViewSet(MixinClass):
+class GenreViewSet(ConditionalGetMixin, CachedListMixin, MixinClass):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    list_versions = ('genres',)
 
 
-class TitleViewSet(ModelViewSet):
-    queryset = (
-        Title.objects.annotate(rating=Avg('reviews__score')).order_by('id')
-    )
+class TitleViewSet(ConditionalGetMixin, CachedListMixin,
+                   SparseFieldsQuerysetMixin, ValuesListMixin, ModelViewSet):
+    # рейтинг в выдаче меняется с каждым отзывом
+    list_versions = ('titles', 'reviews')
+    detail_versions = ('title:{pk}', 'categories', 'genres')
+    queryset = Title.objects.order_by('id')
+    values_serializer_class = TitleValuesSerializer
     filterset_class = TitleFilter
+    pagination_class = TitlePagination
     permission_classes = [IsAuthenticatedOrReadOnly, AdminOrReadOnly]
+    select_related_fields = ('category',)
+    prefetch_related_fields = ('genre',)
+    deferred_fields = ('description',)
+
+    def get_queryset(self):
+        return self.optimize_queryset(super().get_queryset())
+
+    def get_throttle_cost(self):
+        if self.request.query_params.get('search'):
+            return SEARCH_THROTTLE_COST
+        return 1
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_detail_versions(), self.cached_retrieve, request,
+            *args, **kwargs
+        )
+
+    def cached_retrieve(self, request, *args, **kwargs):
+        # в кэше полное представление, ?fields=/?omit= применяются к нему
+        data, status = title_cache.get_or_set(
+            kwargs['pk'], self.version_values,
+            partial(self.serialize_title, kwargs['pk'])
+        )
+        response = Response({
+            name: value for name, value in data.items()
+            if is_field_requested(request, name)
+        })
+        response['X-Cache'] = status
+        return response
+
+    def serialize_title(self, pk):
+        title = get_object_or_404(
+            Title.objects.select_related('category').prefetch_related('genre'),
+            pk=pk
+        )
+        self.check_object_permissions(self.request, title)
+        return TitleListSerializer(title).data
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return TitleListSerializer
+        if self.action in ('stats', 'bulk_stats'):
+            return TitleStatsSerializer
+        if self.action == 'bulk':
+            return TitleBulkSerializer
         return TitlePostSerializer
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        # все произведения сохраняются одной транзакцией или не сохраняются
+        # вовсе; ошибки возвращаются списком по порядку элементов
+        items = request.data
+        if (not isinstance(items, list)
+                or not 0 < len(items) <= MAX_BULK_TITLES):
+            raise serializers.ValidationError({
+                'non_field_errors': [
+                    f'Передайте список из 1-{MAX_BULK_TITLES} произведений'
+                ]
+            })
+        serializer = TitleBulkSerializer(
+            data=items, many=True, context=get_bulk_context(items)
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        title = get_object_or_404(Title.objects.select_related('stats'), pk=pk)
+        return Response(self.get_serializer(title).data)
+
+    @action(detail=False, url_path='stats', url_name='bulk-stats')
+    def bulk_stats(self, request):
+        ids = request.query_params.get('ids', '').split(',')
+        if not all(pk.isdigit() for pk in ids) or len(ids) > MAX_BULK_IDS:
+            raise serializers.ValidationError({
+                'ids': f'Укажите до {MAX_BULK_IDS} id произведений '
+                       'через запятую'
+            })
+        titles = (
+            Title.objects.filter(pk__in=ids)
+            .select_related('stats')
+            .order_by('id')
+        )
+        return Response(self.get_serializer(titles, many=True).data)
+
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
@@ -106,7 +345,7 @@ class UserViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated]
     )
     def me(self, request):
-        user = request.user
+        user = get_full_user(request.user)
         if request.method == 'GET':
             serializer = UserSerializer(user)
             return Response(serializer.data)
@@ -125,26 +364,19 @@ def create_new_user(request):
     email = serializer.validated_data['email']
     # нижнее подчёркивание это "мусорный" аргумент, он не учитывается
     # иначе отдаёт кортеж
-    user,  _ = User.objects.get_or_create(email=email)
-    code = default_token_generator.make_token(user)
-    send_mail(
-        'Automatic registration',
-        f'Dear User, for access to API use this code: {code}',
-        settings.EMAIL_HOST_USER,
-        [email],
-        fail_silently=False,
-    )
+    with transaction.atomic():
+        user,  _ = User.objects.get_or_create(email=email)
+        code = default_token_generator.make_token(user)
+        # письмо отправит команда send_outbox, ответ не ждёт SMTP
+        enqueue_mail(
+            'Automatic registration',
+            f'Dear User, for access to API use this code: {code}',
+            email,
+            settings.EMAIL_HOST_USER,
+        )
     return Response(serializer.data)
 
 
-def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
-    return {
-        'refresh': str(refresh),
-        'access': str(refresh.access_token),
-    }
-
-
 @csrf_exempt
 @api_view(['POST'])
 def get_token(request):
@@ -158,3 +390,69 @@ def get_token(request):
         tokens = get_tokens_for_user(user)
         return Response({'token': tokens})
     return Response({'message': 'wrong confirmation code'})
+
+
+@api_view(['GET'])
+@throttle_classes([AutocompleteThrottle])
+def autocomplete(request):
+    # ответ из индекса в памяти, без запросов к базе
+    query = request.query_params.get('q', '')
+    limit = request.query_params.get('limit', '10')
+    if not query.strip():
+        raise serializers.ValidationError({
+            'q': 'Укажите начало названия в параметре q'
+        })
+    if not limit.isdigit():
+        raise serializers.ValidationError({
+            'limit': 'Количество подсказок должно быть целым числом'
+        })
+    limit = min(int(limit), MAX_AUTOCOMPLETE_LIMIT)
+    return Response(autocomplete_index.search(query, limit))
+
+
+@api_view(['GET'])
+@permission_classes([AdminPermission])
+def export_titles(request):
+    # параметр format занят DRF под выбор рендерера
+    output = request.query_params.get('output', 'ndjson')
+    embed = set(filter(None, request.query_params.get('embed', '').split(',')))
+    if output not in OUTPUTS:
+        raise serializers.ValidationError({
+            'output': f'Допустимые форматы: {", ".join(OUTPUTS)}'
+        })
+    if not embed <= {'reviews', 'comments'}:
+        raise serializers.ValidationError({
+            'embed': 'Можно встроить reviews и comments'
+        })
+    if 'comments' in embed:
+        embed.add('reviews')
+    if output == 'csv':
+        if embed:
+            raise serializers.ValidationError({
+                'embed': 'Отзывы встраиваются только в NDJSON'
+            })
+        content, content_type = iter_csv(request), 'text/csv'
+    else:
+        content = iter_ndjson(request, embed)
+        content_type = 'application/x-ndjson'
+    response = StreamingHttpResponse(
+        content, content_type=f'{content_type}; charset=utf-8'
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="titles.{output}"'
+    )
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([AdminPermission])
+def db_pool_metrics(request):
+    # пулы создаются при первом соединении - до него ответ пустой
+    return Response(pool_stats())
+
+
+@api_view(['GET'])
+@permission_classes([AdminPermission])
+def title_cache_metrics(request):
+    # счётчики этого процесса, у каждого воркера gunicorn свои
+    return Response(title_cache.stats())
@@ -0,0 +1,39 @@
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+
+
+class HealthCheckDatabaseWrapperMixin:
+    """Аналог CONN_HEALTH_CHECKS из Django 4.1.
+
+    Постоянное соединение, которое успел закрыть сервер, проверяется и
+    заменяется новым при первом обращении к базе в запросе, а не в его
+    начале: запросы без базы (304, ответы из кэша) не платят за SELECT 1.
+    """
+
+    health_check_done = True
+
+    def connect(self):
+        super().connect()
+        # новое соединение проверять незачем
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        self.close_if_health_check_failed()
+        super().ensure_connection()
+
+    def close_if_health_check_failed(self):
+        # внутри транзакции соединение не подменяем
+        if (self.health_check_done or self.connection is None
+                or self.in_atomic_block
+                or not self.settings_dict.get('CONN_HEALTH_CHECKS')):
+            return
+        self.health_check_done = True
+        if not self.is_usable():
+            self.close()
+
+
+@receiver(request_started)
+def reset_health_checks(sender, **kwargs):
+    for connection in connections.all():
+        connection.health_check_done = False
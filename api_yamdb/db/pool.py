@@ -0,0 +1,204 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import closing
+from functools import partial
+
+from django.db import DatabaseError
+
+logger = logging.getLogger('api_yamdb.db')
+
+
+class PoolTimeout(DatabaseError):
+    pass
+
+
+class ConnectionPool:
+    """Общие для потоков процесса соединения с лимитом размера.
+
+    Соединения создаёт и проверяет вызывающий код, пул только хранит
+    свободные (последнее возвращённое выдаётся первым - оно «теплее»),
+    ограничивает их общее число и считает метрики ожидания.
+    """
+
+    def __init__(self, size=10, timeout=10, max_age=None, check=None):
+        self.size = size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.check = check
+        self.idle = deque()
+        self.created = {}
+        self.in_use = 0
+        self.waiters = 0
+        self.condition = threading.Condition()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.discards = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def checkout(self, connect):
+        start = time.monotonic()
+        with self.condition:
+            if not self.idle and self.in_use >= self.size:
+                self.waiters += 1
+                try:
+                    self.wait(start + self.timeout)
+                finally:
+                    self.waiters -= 1
+            self.in_use += 1
+            connection = self.idle.pop() if self.idle else None
+            waited = time.monotonic() - start
+            self.checkouts += 1
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+        # соединение создаётся и проверяется вне блокировки
+        try:
+            if connection is not None:
+                if self.is_usable(connection):
+                    return connection
+                self.discard(connection)
+            connection = connect()
+        except BaseException:
+            self.release()
+            raise
+        with self.condition:
+            self.connects += 1
+            self.created[id(connection)] = time.monotonic()
+        return connection
+
+    def wait(self, deadline):
+        while not self.idle and self.in_use >= self.size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.timeouts += 1
+                raise PoolTimeout(
+                    f'Нет свободного соединения за {self.timeout} с '
+                    f'(занято {self.in_use} из {self.size})'
+                )
+            self.condition.wait(remaining)
+
+    def checkin(self, connection, discard=False):
+        with self.condition:
+            expired = self.is_expired(connection)
+            if not (discard or expired):
+                self.idle.append(connection)
+            self.in_use -= 1
+            self.condition.notify()
+        if discard or expired:
+            self.discard(connection)
+
+    def release(self):
+        # выданное соединение так и не появилось - освобождаем место
+        with self.condition:
+            self.in_use -= 1
+            self.condition.notify()
+
+    def is_expired(self, connection):
+        created = self.created.get(id(connection))
+        return (
+            self.max_age is not None and created is not None
+            and time.monotonic() - created >= self.max_age
+        )
+
+    def is_usable(self, connection):
+        return self.check is None or self.check(connection)
+
+    def discard(self, connection):
+        with self.condition:
+            self.discards += 1
+            self.created.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            logger.warning('Не удалось закрыть соединение пула', exc_info=True)
+
+    def close_idle(self):
+        with self.condition:
+            connections, self.idle = list(self.idle), deque()
+        for connection in connections:
+            self.discard(connection)
+
+    def stats(self):
+        with self.condition:
+            return {
+                'size': self.size,
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                'waiters': self.waiters,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'connects': self.connects,
+                'discards': self.discards,
+                'wait_time': round(self.wait_time, 6),
+                'max_wait_time': round(self.max_wait_time, 6),
+                'avg_wait_time': round(
+                    self.wait_time / self.checkouts, 6
+                ) if self.checkouts else 0.0,
+            }
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def get_pool(alias, options, check=None):
+    with pools_lock:
+        if alias not in pools:
+            pools[alias] = ConnectionPool(
+                size=options.get('SIZE', 10),
+                timeout=options.get('TIMEOUT', 10),
+                max_age=options.get('MAX_AGE'),
+                check=check if options.get('HEALTH_CHECKS', True) else None,
+            )
+        return pools[alias]
+
+
+def pool_stats():
+    with pools_lock:
+        return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+def check_connection(Database, connection):
+    try:
+        with closing(connection.cursor()) as cursor:
+            cursor.execute('SELECT 1')
+    except Database.Error:
+        return False
+    return True
+
+
+class PooledDatabaseWrapperMixin:
+    """Берёт физические соединения из пула вместо открытия новых.
+
+    При CONN_MAX_AGE = 0 Django «закрывает» соединение в конце каждого
+    запроса - здесь оно возвращается в пул и достаётся следующему
+    запросу любого потока процесса.
+    """
+
+    @property
+    def pool(self):
+        return get_pool(
+            self.alias, self.settings_dict.get('POOL', {}),
+            partial(check_connection, self.Database)
+        )
+
+    def get_new_connection(self, conn_params):
+        return self.pool.checkout(
+            partial(super().get_new_connection, conn_params)
+        )
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # соединение из незавершённой транзакции или после ошибки
+        # другому запросу не отдаём
+        discard = self.in_atomic_block or self.errors_occurred
+        if not discard:
+            try:
+                self.connection.rollback()
+            except self.Database.Error:
+                discard = True
+        self.pool.checkin(self.connection, discard=discard)
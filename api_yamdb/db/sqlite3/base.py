@@ -0,0 +1,10 @@
+from django.db.backends.sqlite3 import base
+
+from ..health import HealthCheckDatabaseWrapperMixin
+from ..pool import PooledDatabaseWrapperMixin
+
+
+# замена PostgreSQL для тестов и бенчмарков пула: с файловой базой
+class DatabaseWrapper(HealthCheckDatabaseWrapperMixin,
+                      PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
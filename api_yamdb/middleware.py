@@ -0,0 +1,76 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('api_yamdb.requests')
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class QueryInstrumentationMiddleware:
+    """Считает SQL-запросы и время БД/Python для каждого запроса.
+
+    Выключенный middleware бросает MiddlewareNotUsed, и Django
+    исключает его из цепочки, поэтому накладных расходов нет.
+    """
+
+    def __init__(self, get_response):
+        options = settings.DB_INSTRUMENTATION
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_request_ms = options['SLOW_REQUEST_MS']
+        self.slow_query_count = options['SLOW_QUERY_COUNT']
+        self.server_timing = options['SERVER_TIMING']
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(counter)
+                )
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = counter.duration * 1000
+        python_ms = total_ms - db_ms
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'db;dur={db_ms:.2f};desc="{counter.count} queries", '
+                f'app;dur={python_ms:.2f}, total;dur={total_ms:.2f}'
+            )
+        if (total_ms >= self.slow_request_ms
+                or counter.count >= self.slow_query_count):
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.path,
+                'view': view_name,
+                'status': response.status_code,
+                'queries': counter.count,
+                'db_ms': round(db_ms, 2),
+                'python_ms': round(python_ms, 2),
+                'total_ms': round(total_ms, 2),
+            }))
+        return response
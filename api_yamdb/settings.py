@@ -23,6 +23,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api_yamdb.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +55,10 @@ TEMPLATES = [
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
 
+def conn_max_age(value):
+    return int(value) if value else None
+
+
 DATABASES = {
     'default': {
         'ENGINE': os.environ.get('DB_ENGINE'),
@@ -62,6 +67,26 @@ DATABASES = {
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
         'PORT': os.environ.get('DB_PORT'),
+        # постоянные соединения: секунды жизни, пустая строка - без
+        # ограничения, 0 - новое соединение на каждый запрос
+        'CONN_MAX_AGE': conn_max_age(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        # проверять постоянное соединение при первом обращении к базе в
+        # запросе; работает с бэкендами api_yamdb.db
+        'CONN_HEALTH_CHECKS': (
+            os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+        ),
+        # пул для DB_ENGINE=api_yamdb.db.postgresql и потоковых воркеров
+        # gunicorn; с пулом DB_CONN_MAX_AGE=0 возвращает соединение в пул
+        # в конце запроса. SIZE - не меньше числа потоков, TIMEOUT и
+        # MAX_AGE - секунды
+        'POOL': {
+            'SIZE': int(os.environ.get('DB_POOL_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'MAX_AGE': int(os.environ.get('DB_POOL_MAX_AGE', 1800)),
+            'HEALTH_CHECKS': (
+                os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+            ),
+        },
     }
 }
 
@@ -110,18 +135,19 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.UserRateThrottle',
-        'rest_framework.throttling.AnonRateThrottle',
+        'api.throttling.UserSlidingWindowThrottle',
+        'api.throttling.AnonSlidingWindowThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'user': '10000/day',
         'anon': '1000/day',
+        'autocomplete': '120/min',
     },
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPagination',
     'PAGE_SIZE': 10  # количество страниц по умолчанию
@@ -139,3 +165,84 @@ SERVER_EMAIL = EMAIL_HOST_USER
 
 
 AUTH_USER_MODEL = 'api.User'
+
+
+# версии данных и кэши ответов; при нескольких воркерах gunicorn кэш должен
+# быть общим, например
+# CACHE_BACKEND=django.core.cache.backends.memcached.PyLibMCCache
+# CACHE_LOCATION=memcached:11211
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'api_yamdb'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+    # ключи карточек произведений содержат версии из кэша default, поэтому
+    # этот кэш может быть и локальным для воркера; общий кэш избавляет
+    # воркеры от повторного расчёта одних и тех же карточек
+    'titles': {
+        'BACKEND': os.environ.get(
+            'TITLE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('TITLE_CACHE_LOCATION', 'api_yamdb_titles'),
+        'TIMEOUT': int(os.environ.get('TITLE_CACHE_TIMEOUT', 3600)),
+        'OPTIONS': {
+            # LocMemCache вытесняет давно не читанные ключи (LRU)
+            'MAX_ENTRIES': int(
+                os.environ.get('TITLE_CACHE_MAX_ENTRIES', 10000)
+            ),
+        },
+    },
+}
+
+# пользователь собирается из токена; при REVALIDATE_TTL > 0 имя и роль
+# сверяются с базой не реже раза в столько секунд, запросы на запись
+# сверяются всегда
+STATELESS_JWT = {
+    'REVALIDATE_TTL': int(os.environ.get('JWT_REVALIDATE_TTL', 0)),
+}
+
+# время жизни закэшированных списков, секунды; устаревшие ответы отсекает
+# версия в ключе, время ограничивает память
+LIST_CACHE_TIMEOUT = int(os.environ.get('LIST_CACHE_TIMEOUT', 3600))
+# сколько секунд после истечения отдавать старое значение, пока один
+# запрос его пересчитывает
+CACHE_STALE_TIMEOUT = int(os.environ.get('CACHE_STALE_TIMEOUT', 60))
+
+# письма из outbox отправляет команда send_outbox; после неудачи попытка
+# повторяется через BACKOFF, 2*BACKOFF, 4*BACKOFF... секунд, но не позже
+# чем через MAX_BACKOFF; взятая воркером пачка закреплена за ним на LEASE
+# секунд
+OUTBOX = {
+    'BATCH_SIZE': int(os.environ.get('OUTBOX_BATCH_SIZE', 100)),
+    'MAX_ATTEMPTS': int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 5)),
+    'BACKOFF': int(os.environ.get('OUTBOX_BACKOFF', 30)),
+    'MAX_BACKOFF': int(os.environ.get('OUTBOX_MAX_BACKOFF', 3600)),
+    'LEASE': int(os.environ.get('OUTBOX_LEASE', 300)),
+    'POLL_INTERVAL': int(os.environ.get('OUTBOX_POLL_INTERVAL', 5)),
+}
+
+
+# счётчики SQL-запросов в заголовке Server-Timing и лог медленных запросов
+DB_INSTRUMENTATION = {
+    'ENABLED': os.environ.get('DB_INSTRUMENTATION', 'False') == 'True',
+    'SERVER_TIMING': True,
+    'SLOW_REQUEST_MS': int(os.environ.get('SLOW_REQUEST_MS', 500)),
+    'SLOW_QUERY_COUNT': int(os.environ.get('SLOW_QUERY_COUNT', 50)),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api_yamdb': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
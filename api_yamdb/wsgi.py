@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
 application = get_wsgi_application()
+
+# индекс автодополнения строится при старте воркера, а не на первом запросе
+from api.autocomplete import index  # noqa: E402
+
+index.warm_up()
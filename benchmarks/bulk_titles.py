@@ -0,0 +1,41 @@
+"""Запись 10 000 произведений одним запросом к /api/v1/titles/bulk/.
+
+    python -m benchmarks.bulk_titles
+"""
+import time
+
+from .common import create_catalogue, setup
+
+SIZES = (1000, 10000)
+
+
+def main():
+    setup()
+    from rest_framework.test import APIClient
+
+    from api.models import Category, Genre, User
+
+    create_catalogue(titles=0)
+    admin = User.objects.create(
+        username='bulk-admin', email='bulk@yamdb.fake', role='admin'
+    )
+    client = APIClient()
+    client.force_authenticate(admin)
+    category = Category.objects.get().slug
+    genres = list(Genre.objects.values_list('slug', flat=True))
+    for size in SIZES:
+        items = [
+            {'name': f'Произведение {i}', 'year': 2000, 'category': category,
+             'genre': genres[:2], 'description': 'описание'}
+            for i in range(size)
+        ]
+        start = time.perf_counter()
+        response = client.post('/api/v1/titles/bulk/', items, format='json')
+        seconds = time.perf_counter() - start
+        assert response.status_code == 201, response.content[:200]
+        print(f'titles/bulk x{size:<6} {seconds:>8.2f} s '
+              f'{size / seconds:>10.0f} произведений/с')
+
+
+if __name__ == '__main__':
+    main()
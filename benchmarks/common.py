@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup():
+    # бенчмарки запускаются на SQLite в памяти, если БД не задана явно
+    sys.path.insert(0, BASE_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    os.environ.setdefault('DB_ENGINE', 'django.db.backends.sqlite3')
+    os.environ.setdefault('DB_NAME', ':memory:')
+    import django
+    from django.conf import settings
+    # троттлинг исказил бы замеры сотнями одинаковых запросов
+    settings.REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES'] = []
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', run_syncdb=True, verbosity=0)
+
+
+def create_catalogue(titles=100, reviews=0, comments=0):
+    from api.models import Category, Comment, Genre, Review, Title, User
+    category = Category.objects.create(name='Фильм', slug='films')
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(3)
+    )
+    genre_ids = list(Genre.objects.values_list('id', flat=True))
+    Title.objects.bulk_create(
+        (
+            Title(name=f'Произведение {i}', year=2000, category=category,
+                  description='описание ' * 20)
+            for i in range(titles)
+        ),
+        batch_size=500
+    )
+    Title.genre.through.objects.bulk_create(
+        (
+            Title.genre.through(title_id=title_id, genre_id=genre_id)
+            for title_id in Title.objects.values_list('id', flat=True)
+            for genre_id in genre_ids[:2]
+        ),
+        batch_size=500
+    )
+    authors = max(reviews, comments)
+    User.objects.bulk_create(
+        (
+            User(username=f'user{i}', email=f'user{i}@yamdb.fake')
+            for i in range(authors)
+        ),
+        batch_size=500
+    )
+    author_ids = list(User.objects.values_list('id', flat=True))
+    title = Title.objects.order_by('id').first()
+    Review.objects.bulk_create(
+        (
+            Review(title=title, author_id=author_id, text='отзыв ' * 20,
+                   score=i % 10 + 1)
+            for i, author_id in enumerate(author_ids[:reviews])
+        ),
+        batch_size=500
+    )
+    review = Review.objects.order_by('id').first()
+    Comment.objects.bulk_create(
+        (
+            Comment(review=review, author_id=author_id, text='комментарий')
+            for author_id in author_ids[:comments]
+        ),
+        batch_size=500
+    )
+    return title, review
+
+
+def measure(func, repeat=200):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def report(rows):
+    for name, value in rows:
+        print(f'{name:<48} {value:>10.3f} ms')
@@ -0,0 +1,91 @@
+"""Запросы в секунду из нескольких потоков: соединение на запрос,
+постоянные соединения и пул api_yamdb.db.
+
+    python -m benchmarks.db_pool
+
+По умолчанию база - файл SQLite во временном каталоге: соединение с ним
+дешёвое, поэтому разница меньше, чем с PostgreSQL. Для замера на
+PostgreSQL задайте DB_ENGINE=django.db.backends.postgresql и параметры
+подключения, как для сервера.
+"""
+import os
+import tempfile
+import threading
+import time
+from wsgiref.util import setup_testing_defaults
+
+from .common import create_catalogue, setup
+
+THREADS = 8
+REQUESTS = 200
+POOLED_ENGINES = {
+    'django.db.backends.sqlite3': 'api_yamdb.db.sqlite3',
+    'django.db.backends.postgresql': 'api_yamdb.db.postgresql',
+}
+
+
+def call(handler, path):
+    # через WSGIHandler, а не тестовый клиент: тот не закрывает
+    # соединения в конце запроса
+    environ = {'PATH_INFO': path}
+    setup_testing_defaults(environ)
+    statuses = []
+    response = handler(
+        environ, lambda status, headers, exc_info=None: statuses.append(status)
+    )
+    b''.join(response)
+    response.close()
+    assert statuses[0].startswith('200'), statuses[0]
+
+
+def run(handler, path):
+    def worker():
+        for _ in range(REQUESTS):
+            call(handler, path)
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return THREADS * REQUESTS / (time.perf_counter() - start)
+
+
+def main():
+    if not os.environ.get('DB_ENGINE'):
+        # база в памяти у каждого соединения своя - нужен файл
+        os.environ['DB_NAME'] = os.path.join(
+            tempfile.mkdtemp(), 'db_pool.sqlite3'
+        )
+    setup()
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+
+    from api_yamdb.db.pool import pool_stats
+
+    title, _ = create_catalogue(titles=10, reviews=20)
+    connections.close_all()
+    database = connections.databases['default']
+    engine = database['ENGINE']
+    database['POOL']['SIZE'] = THREADS
+    handler = WSGIHandler()
+    path = f'/api/v1/titles/{title.pk}/reviews/'
+    for name, options in (
+        ('соединение на запрос', {'ENGINE': engine, 'CONN_MAX_AGE': 0}),
+        ('постоянные соединения', {'ENGINE': engine, 'CONN_MAX_AGE': 60}),
+        ('пул', {'ENGINE': POOLED_ENGINES[engine], 'CONN_MAX_AGE': 0}),
+    ):
+        # настройки читаются при создании соединения в каждом потоке
+        database.update(options)
+        rps = run(handler, path)
+        print(f'{name:<24} {rps:>10.0f} запросов/с')
+    stats = pool_stats()['default']
+    print(
+        f'пул: соединений {stats["connects"]}, выдач {stats["checkouts"]}, '
+        f'ожидание макс. {stats["max_wait_time"] * 1000:.2f} мс'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""Скорость потоковой выгрузки /api/v1/export/titles/ в МБ/с.
+
+    python -m benchmarks.export
+"""
+import time
+
+from .common import create_catalogue, setup
+
+TITLES = 20000
+
+
+def main():
+    setup()
+    from rest_framework.test import APIClient
+
+    from api.models import User
+
+    create_catalogue(titles=TITLES, reviews=1000, comments=1000)
+    admin = User.objects.create(
+        username='export-admin', email='export@yamdb.fake', role='admin'
+    )
+    client = APIClient()
+    client.force_authenticate(admin)
+    for query in ('', '?output=csv', '?embed=comments'):
+        start = time.perf_counter()
+        response = client.get(f'/api/v1/export/titles/{query}')
+        size = sum(len(chunk) for chunk in response.streaming_content)
+        seconds = time.perf_counter() - start
+        print(
+            f'{"export" + query:<32} {size / 2 ** 20:>8.1f} МБ '
+            f'{size / 2 ** 20 / seconds:>8.1f} МБ/с'
+        )
+
+
+if __name__ == '__main__':
+    main()
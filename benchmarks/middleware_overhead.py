@@ -0,0 +1,33 @@
+"""Накладные расходы QueryInstrumentationMiddleware.
+
+    python -m benchmarks.middleware_overhead
+"""
+from .common import create_catalogue, measure, report, setup
+
+
+def main():
+    setup()
+    from django.test import Client, override_settings
+
+    create_catalogue(titles=100)
+    rows = []
+    for enabled in (False, True):
+        options = {
+            'ENABLED': enabled,
+            'SERVER_TIMING': True,
+            'SLOW_REQUEST_MS': 10 ** 6,
+            'SLOW_QUERY_COUNT': 10 ** 6,
+        }
+        with override_settings(DB_INSTRUMENTATION=options):
+            client = Client()
+            for url in ('/api/v1/titles/?page_size=100', '/api/v1/genres/'):
+                state = 'enabled' if enabled else 'disabled'
+                rows.append((
+                    f'GET {url} ({state})',
+                    measure(lambda: client.get(url))
+                ))
+    report(rows)
+
+
+if __name__ == '__main__':
+    main()
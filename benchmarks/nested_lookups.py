@@ -0,0 +1,93 @@
+"""Вложенные маршруты отзывов и комментариев: прежняя и текущая выборка,
+глубокие страницы с номером и с курсором.
+
+    python -m benchmarks.nested_lookups
+"""
+from .common import create_catalogue, measure, report, setup
+
+
+def main():
+    setup()
+    from urllib.parse import parse_qs, urlparse
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.generics import get_object_or_404
+    from rest_framework.pagination import Cursor
+    from rest_framework.test import APIRequestFactory
+
+    from api.models import Review, Title
+    from api.pagination import PubDateCursorPagination
+    from api.views import CommentViewSet, ReviewViewSet
+
+    class LegacyReviewViewSet(ReviewViewSet):
+        # поведение до оптимизации: отдельный get_object_or_404
+        # и автор, загружаемый для каждой строки
+
+        def paginate_queryset(self, queryset):
+            return super(ReviewViewSet, self).paginate_queryset(queryset)
+
+        def get_queryset(self):
+            title = get_object_or_404(Title, id=self.kwargs['title_id'])
+            return title.reviews.all()
+
+    class LegacyCommentViewSet(CommentViewSet):
+
+        def paginate_queryset(self, queryset):
+            return super(CommentViewSet, self).paginate_queryset(queryset)
+
+        def get_queryset(self):
+            review = get_object_or_404(
+                Review, id=self.kwargs['review_id'],
+                title__id=self.kwargs['title_id']
+            )
+            return review.comments.all()
+
+    title, review = create_catalogue(titles=1, reviews=10000, comments=1000)
+    factory = APIRequestFactory()
+    cases = (
+        ('reviews', ReviewViewSet, LegacyReviewViewSet,
+         {'title_id': title.id}),
+        ('comments', CommentViewSet, LegacyCommentViewSet,
+         {'title_id': title.id, 'review_id': review.id}),
+    )
+    rows = []
+    for name, current, legacy, kwargs in cases:
+        for label, viewset in (('legacy', legacy), ('current', current)):
+            view = viewset.as_view({'get': 'list'})
+            for page_size in (10, 100):
+                def call():
+                    request = factory.get('/', {'page_size': page_size})
+                    return view(request, **kwargs).render()
+                with CaptureQueriesContext(connection) as queries:
+                    call()
+                rows.append((
+                    f'{name} page_size={page_size} {label} '
+                    f'({len(queries)} queries)',
+                    measure(call, repeat=50)
+                ))
+    view = ReviewViewSet.as_view({'get': 'list'})
+    kwargs = {'title_id': title.id}
+    deep = Review.objects.filter(title=title).order_by('-pub_date', '-id')
+    position = deep[9000].pub_date
+    paginator = PubDateCursorPagination()
+    paginator.base_url = '/'
+    cursor = parse_qs(urlparse(paginator.encode_cursor(
+        Cursor(offset=0, reverse=False, position=str(position))
+    )).query)['cursor'][0]
+    for label, params in (
+        ('page=1', {}),
+        ('page=900', {'page': 900}),
+        ('cursor first page', {'pagination': 'cursor'}),
+        ('cursor at row 9000', {'cursor': cursor}),
+    ):
+        rows.append((
+            f'reviews {label}',
+            measure(lambda: view(factory.get('/', params), **kwargs).render(),
+                    repeat=50)
+        ))
+    report(rows)
+
+
+if __name__ == '__main__':
+    main()
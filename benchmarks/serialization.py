@@ -0,0 +1,55 @@
+"""ModelSerializer против ValuesListSerializer на списках 10/100/1000 строк.
+
+    python -m benchmarks.serialization
+"""
+from .common import create_catalogue, measure, report, setup
+
+
+def main():
+    setup()
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.views import APIView
+
+    from api.models import Review, Title
+    from api.serializers import (ReviewSerializer, ReviewValuesSerializer,
+                                 TitleListSerializer, TitleValuesSerializer)
+
+    create_catalogue(titles=1000, reviews=1000)
+    request = APIView().initialize_request(APIRequestFactory().get('/'))
+    renderer = JSONRenderer()
+    cases = (
+        ('titles', TitleListSerializer, TitleValuesSerializer,
+         Title.objects.select_related('category').prefetch_related('genre')
+         .order_by('id')),
+        ('reviews', ReviewSerializer, ReviewValuesSerializer,
+         Review.objects.select_related('author')),
+    )
+    rows = []
+    for name, serializer_class, values_serializer_class, queryset in cases:
+        for size in (10, 100, 1000):
+            def model_path():
+                data = serializer_class(
+                    queryset.all()[:size], many=True,
+                    context={'request': request}
+                ).data
+                return renderer.render(data)
+
+            def values_path():
+                serializer = values_serializer_class(request)
+                page = queryset.prefetch_related(None).values(
+                    *serializer.get_columns()
+                )[:size]
+                return renderer.render(serializer.to_representation(page))
+
+            assert model_path() == values_path()
+            repeat = 2000 // size
+            rows.append((f'{name} x{size} ModelSerializer',
+                         measure(model_path, repeat)))
+            rows.append((f'{name} x{size} ValuesListSerializer',
+                         measure(values_path, repeat)))
+    report(rows)
+
+
+if __name__ == '__main__':
+    main()
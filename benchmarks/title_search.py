@@ -0,0 +1,53 @@
+"""Поиск произведений: icontains против FTS5/триграмм при росте каталога.
+
+    python -m benchmarks.title_search
+"""
+import random
+
+from .common import measure, report, setup
+
+SYLLABLES = (
+    'ба', 'ве', 'го', 'ду', 'же', 'зи', 'ко', 'ла', 'ми', 'но', 'пу', 'ре',
+    'са', 'ти', 'фу', 'ха', 'це', 'чи', 'ша', 'юр', 'ян', 'ост', 'кра', 'вел',
+)
+
+
+def random_name():
+    return ' '.join(
+        ''.join(random.choices(SYLLABLES, k=random.randint(2, 4)))
+        for _ in range(random.randint(1, 3))
+    )
+
+
+def main():
+    setup()
+    from api.filters import TitleFilter
+    from api.models import Title
+
+    random.seed(0)
+    rows = []
+    total = 0
+    for size in (1000, 10000, 100000):
+        Title.objects.bulk_create(
+            (
+                Title(name=random_name(), year=2000)
+                for i in range(total, size)
+            ),
+            batch_size=500
+        )
+        total = size
+        Title.objects.create(name='Мастер и Маргарита', year=1966)
+        for label, params in (
+            ('name=маргарита (icontains)', {'name': 'маргарита'}),
+            ('search=маргарита (fts)', {'search': 'маргарита'}),
+            ('search=маргорита (fts, опечатка)', {'search': 'маргорита'}),
+        ):
+            def call():
+                queryset = TitleFilter(params, Title.objects.all()).qs
+                return list(queryset[:10])
+            rows.append((f'{size} titles {label}', measure(call, repeat=20)))
+    report(rows)
+
+
+if __name__ == '__main__':
+    main()
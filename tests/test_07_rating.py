@@ -0,0 +1,100 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from api.models import Review, Title
+
+from .common import create_reviews
+
+
+class Test07RatingAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_rating_follows_reviews(self, user_client, admin):
+        reviews, titles, user, moderator = create_reviews(user_client, admin)
+        title_id = titles[0]['id']
+        response = user_client.get(f'/api/v1/titles/{title_id}/')
+        assert response.json().get('rating') == 4, \
+            'Проверьте, что `rating` произведения равен целой части средней оценки его отзывов'
+        user_client.patch(
+            f'/api/v1/titles/{title_id}/reviews/{reviews[0]["id"]}/',
+            data={'score': 10}
+        )
+        title = Title.objects.get(id=title_id)
+        assert (title.score_sum, title.score_count, title.rating) == (17, 3, 5), \
+            'Проверьте, что при изменении оценки отзыва пересчитывается рейтинг произведения'
+        user_client.delete(f'/api/v1/titles/{title_id}/reviews/{reviews[0]["id"]}/')
+        user_client.delete(f'/api/v1/titles/{title_id}/reviews/{reviews[1]["id"]}/')
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count, title.rating) == (4, 1, 4), \
+            'Проверьте, что при удалении отзыва пересчитывается рейтинг произведения'
+        moderator.delete()
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count, title.rating) == (0, 0, None), \
+            'Проверьте, что рейтинг произведения без отзывов равен `None`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_recalculate_ratings(self, user_client, admin):
+        _, titles, _, _ = create_reviews(user_client, admin)
+        call_command('recalculate_ratings', '--check')
+        Title.objects.filter(id=titles[0]['id']).update(score_sum=0, rating=1)
+        with pytest.raises(CommandError):
+            call_command('recalculate_ratings', '--check')
+        call_command('recalculate_ratings')
+        call_command('recalculate_ratings', '--check')
+        title = Title.objects.get(id=titles[0]['id'])
+        assert (title.score_sum, title.score_count, title.rating) == (12, 3, 4), \
+            'Проверьте, что команда `recalculate_ratings` восстанавливает агрегаты оценок'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_deferred_score(self, user_client, admin):
+        reviews, titles, _, _ = create_reviews(user_client, admin)
+        title_id = titles[0]['id']
+        review = Review.objects.only('id', 'text').get(pk=reviews[0]['id'])
+        review.text = 'Новый текст'
+        review.save()
+        review = Review.objects.defer('score').get(pk=reviews[1]['id'])
+        review.score = 10
+        review.save()
+        title = Title.objects.get(id=title_id)
+        assert (title.score_sum, title.score_count) == (19, 3), \
+            'Проверьте, что отзыв, загруженный через `only()`/`defer()`, не считается новым'
+        Review.objects.only('id').get(pk=reviews[2]['id']).delete()
+        title = Title.objects.get(id=title_id)
+        assert (title.score_sum, title.score_count) == (15, 2), \
+            'Проверьте, что удаление отзыва с отложенной оценкой вычитает её из агрегатов'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_title_stats(self, client, user_client, admin):
+        reviews, titles, _, _ = create_reviews(user_client, admin)
+        title_id = titles[0]['id']
+        response = client.get(f'/api/v1/titles/{title_id}/stats/')
+        assert response.status_code == 200, \
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/stats/` возвращается статус 200'
+        data = response.json()
+        expected = {str(score): 0 for score in range(1, 11)}
+        expected.update({'3': 1, '4': 1, '5': 1})
+        assert data == {'title': title_id, 'rating': 4, 'count': 3, 'scores': expected}, \
+            'Проверьте, что `/api/v1/titles/{title_id}/stats/` возвращает распределение оценок произведения'
+        user_client.patch(
+            f'/api/v1/titles/{title_id}/reviews/{reviews[0]["id"]}/',
+            data={'score': 3}
+        )
+        user_client.delete(f'/api/v1/titles/{title_id}/reviews/{reviews[2]["id"]}/')
+        response = client.get(f'/api/v1/titles/stats/?ids={title_id},{titles[1]["id"]}')
+        assert response.status_code == 200, \
+            'Проверьте, что при GET запросе `/api/v1/titles/stats/?ids=` возвращается статус 200'
+        data = response.json()
+        assert [item['title'] for item in data] == [title_id, titles[1]['id']], \
+            'Проверьте, что `/api/v1/titles/stats/?ids=` возвращает распределения для всех переданных id'
+        assert data[0]['scores']['3'] == 2 and data[0]['scores']['4'] == 0 \
+            and data[0]['scores']['5'] == 0, \
+            'Проверьте, что распределение оценок обновляется при изменении и удалении отзывов'
+        assert data[1]['count'] == 0 and set(data[1]['scores'].values()) == {0}, \
+            'Проверьте, что у произведения без отзывов распределение оценок нулевое'
+        response = client.get('/api/v1/titles/stats/?ids=abc')
+        assert response.status_code == 400, \
+            'Проверьте, что при неправильном параметре `ids` возвращается статус 400'
+        response = client.get('/api/v1/titles/999/stats/')
+        assert response.status_code == 404, \
+            'Проверьте, что для несуществующего произведения возвращается статус 404'
+        call_command('recalculate_ratings', '--check')
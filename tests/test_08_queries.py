@@ -0,0 +1,106 @@
+import pytest
+from django.contrib.auth import get_user_model
+
+from api.models import Category, Comment, Genre, Review, Title
+
+PAGE_SIZES = (10, 100)
+
+
+def create_catalogue(size):
+    category = Category.objects.create(name='Фильм', slug='films')
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(3)
+    )
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {i}', year=2000, category=category)
+        for i in range(size)
+    )
+    genre_ids = list(Genre.objects.values_list('id', flat=True)[:2])
+    Title.genre.through.objects.bulk_create(
+        Title.genre.through(title_id=title_id, genre_id=genre_id)
+        for title_id in Title.objects.values_list('id', flat=True)
+        for genre_id in genre_ids
+    )
+    get_user_model().objects.bulk_create(
+        get_user_model()(username=f'user{i}', email=f'user{i}@yamdb.fake')
+        for i in range(size)
+    )
+    authors = get_user_model().objects.filter(username__startswith='user')
+    title = Title.objects.first()
+    Review.objects.bulk_create(
+        Review(title=title, author=author, text='текст', score=5)
+        for author in authors
+    )
+    review = Review.objects.first()
+    Comment.objects.bulk_create(
+        Comment(review=review, author=author, text='текст')
+        for author in authors
+    )
+    return title, review
+
+
+class Test08QueryBudget:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('page_size', PAGE_SIZES)
+    def test_01_titles(self, client, django_assert_num_queries, page_size):
+        create_catalogue(100)
+        # count + страница + жанры страницы
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/?page_size={page_size}')
+        assert len(response.json()['results']) == page_size, \
+            'Проверьте, что `/api/v1/titles/` возвращает страницу нужного размера'
+        title = Title.objects.first()
+        with django_assert_num_queries(2):
+            client.get(f'/api/v1/titles/{title.id}/')
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('page_size', PAGE_SIZES)
+    def test_02_reviews(self, client, django_assert_num_queries, page_size):
+        title, _ = create_catalogue(100)
+        # count + страница с авторами, без отдельной проверки произведения
+        with django_assert_num_queries(2):
+            response = client.get(
+                f'/api/v1/titles/{title.id}/reviews/?page_size={page_size}'
+            )
+        assert len(response.json()['results']) == page_size, \
+            'Проверьте, что `/api/v1/titles/{title_id}/reviews/` возвращает страницу нужного размера'
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('page_size', PAGE_SIZES)
+    def test_03_comments(self, client, django_assert_num_queries, page_size):
+        title, review = create_catalogue(100)
+        with django_assert_num_queries(2):
+            response = client.get(
+                f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+                f'?page_size={page_size}'
+            )
+        assert len(response.json()['results']) == page_size, \
+            'Проверьте, что `/api/v1/titles/{title_id}/reviews/{review_id}/comments/` ' \
+            'возвращает страницу нужного размера'
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('page_size', PAGE_SIZES)
+    def test_04_users(self, user_client, django_assert_num_queries, page_size):
+        create_catalogue(100)
+        # пользователь из токена + count + страница
+        with django_assert_num_queries(3):
+            response = user_client.get(f'/api/v1/users/?page_size={page_size}')
+        assert len(response.json()['results']) == page_size, \
+            'Проверьте, что `/api/v1/users/` возвращает страницу нужного размера'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_missing_parent(self, client, django_assert_num_queries):
+        title, review = create_catalogue(1)
+        response = client.get('/api/v1/titles/999/reviews/')
+        assert response.status_code == 404, \
+            'Проверьте, что для несуществующего произведения возвращается статус 404'
+        response = client.get(f'/api/v1/titles/999/reviews/{review.id}/comments/')
+        assert response.status_code == 404, \
+            'Проверьте, что для отзыва другого произведения возвращается статус 404'
+        Comment.objects.all().delete()
+        # пустая страница: count + проверка отзыва
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/')
+        assert response.status_code == 200, \
+            'Проверьте, что для отзыва без комментариев возвращается статус 200'
@@ -0,0 +1,45 @@
+import logging
+
+import pytest
+from rest_framework.test import APIClient
+
+from api.models import Genre, Title
+
+OPTIONS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'SLOW_REQUEST_MS': 10 ** 6,
+    'SLOW_QUERY_COUNT': 10 ** 6,
+}
+
+
+class Test09Instrumentation:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_disabled(self, settings):
+        settings.DB_INSTRUMENTATION = dict(OPTIONS, ENABLED=False)
+        response = APIClient().get('/api/v1/genres/')
+        assert 'Server-Timing' not in response, \
+            'Проверьте, что выключенный middleware не добавляет заголовок `Server-Timing`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_server_timing(self, settings):
+        settings.DB_INSTRUMENTATION = OPTIONS
+        Genre.objects.create(name='Драма', slug='drama')
+        response = APIClient().get('/api/v1/genres/')
+        assert response['Server-Timing'].startswith('db;dur='), \
+            'Проверьте, что middleware добавляет время БД в заголовок `Server-Timing`'
+        assert 'desc="2 queries"' in response['Server-Timing'], \
+            'Проверьте, что в заголовке `Server-Timing` указано количество SQL-запросов'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_slow_request_log(self, settings, caplog):
+        settings.DB_INSTRUMENTATION = dict(OPTIONS, SLOW_QUERY_COUNT=1)
+        Title.objects.create(name='Проект', year=2020)
+        with caplog.at_level(logging.WARNING, logger='api_yamdb.requests'):
+            APIClient().get('/api/v1/titles/')
+        assert len(caplog.records) == 1, \
+            'Проверьте, что запрос сверх порога пишется в лог медленных запросов'
+        message = caplog.records[0].getMessage()
+        assert '"view": "titles-list"' in message and '"queries": 3' in message, \
+            'Проверьте, что в логе указаны имя представления и количество запросов'
@@ -0,0 +1,99 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Title
+
+from .common import create_comments, create_reviews, create_titles
+
+
+class Test10Pagination:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reviews_cursor(self, client, user_client, admin, django_assert_num_queries):
+        reviews, titles, _, _ = create_reviews(user_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(f'{url}?pagination=cursor&page_size=2')
+        assert response.status_code == 200, \
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/reviews/?pagination=cursor` ' \
+            'возвращается статус 200'
+        data = response.json()
+        assert 'count' not in data and data['previous'] is None, \
+            'Проверьте, что курсорная пагинация не считает количество объектов'
+        ids = [review['id'] for review in data['results']]
+        # курсорная страница - один запрос без COUNT
+        with django_assert_num_queries(1):
+            response = client.get(data['next'])
+        ids += [review['id'] for review in response.json()['results']]
+        assert ids == [review['id'] for review in reversed(reviews)], \
+            'Проверьте, что курсорная пагинация отдаёт отзывы от новых к старым без пропусков'
+        assert response.json()['next'] is None, \
+            'Проверьте, что на последней странице `next` равен `None`'
+        response = client.get(f'{url}?page_size=2')
+        assert response.json()['count'] == len(reviews), \
+            'Проверьте, что без параметра `pagination` используется постраничная пагинация'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_comments_cursor(self, client, user_client, admin):
+        comments, reviews, titles, _, _ = create_comments(user_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        response = client.get(f'{url}?pagination=cursor&page_size=10')
+        assert [comment['id'] for comment in response.json()['results']] == \
+            [comment['id'] for comment in reversed(comments)], \
+            'Проверьте, что курсорная пагинация отдаёт комментарии от новых к старым'
+        response = client.get('/api/v1/titles/999/reviews/?pagination=cursor')
+        assert response.status_code == 404, \
+            'Проверьте, что для несуществующего произведения возвращается статус 404'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_titles_cached_count(self, client, user_client, django_assert_num_queries):
+        titles, _, _ = create_titles(user_client)
+        response = client.get('/api/v1/titles/?year=2000')
+        assert response.json()['count'] == 1, \
+            'Проверьте, что `/api/v1/titles/` возвращает количество произведений'
+        # повторный запрос с теми же фильтрами берёт count из кэша
+        with django_assert_num_queries(2):
+            response = client.get('/api/v1/titles/?year=2000&page=1')
+        assert response.json()['count'] == 1, \
+            'Проверьте, что кэшированное количество произведений совпадает с точным'
+        Title.objects.create(name='Новое', year=2000)
+        response = client.get('/api/v1/titles/?year=2000')
+        assert response.json()['count'] == 2, \
+            'Проверьте, что кэш количества сбрасывается при изменении произведений'
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/?year=2000&count=exact')
+        assert response.json()['count'] == 2, \
+            'Проверьте, что `count=exact` возвращает точное количество'
+        response = client.get('/api/v1/titles/?count=wrong')
+        assert response.status_code == 400, \
+            'Проверьте, что при неправильном параметре `count` возвращается статус 400'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_count_after_commit(self, client, user_client):
+        create_titles(user_client)
+        with transaction.atomic():
+            Title.objects.create(name='Новое', year=2000)
+            # count, посчитанный во время записи, кэшируется до фиксации
+            client.get('/api/v1/titles/?year=2000')
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/v1/titles/?year=2000&page=1')
+        assert response.json()['count'] == 2 \
+            and any('COUNT(' in query['sql'] for query in queries.captured_queries), \
+            'Проверьте, что count, закэшированный до фиксации записи, пересчитывается после неё'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_titles_without_count(self, client, user_client, django_assert_num_queries):
+        titles, _, _ = create_titles(user_client)
+        # страница с лишней строкой + жанры, без COUNT
+        with django_assert_num_queries(2):
+            response = client.get('/api/v1/titles/?count=none&page_size=1')
+        data = response.json()
+        assert 'count' not in data and data['previous'] is None, \
+            'Проверьте, что при `count=none` количество произведений не возвращается'
+        assert 'page=2' in data['next'] and len(data['results']) == 1, \
+            'Проверьте, что при `count=none` возвращается ссылка на следующую страницу'
+        data = client.get(data['next']).json()
+        assert data['next'] is None and data['previous'] is not None, \
+            'Проверьте, что на последней странице `next` равен `None`'
+        assert data['results'][0]['id'] == titles[1]['id'], \
+            'Проверьте, что при `count=none` вторая страница содержит следующие произведения'
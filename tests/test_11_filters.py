@@ -0,0 +1,66 @@
+import pytest
+from django.db import connection
+
+from api.filters import TitleFilter
+from api.models import Title
+
+from .common import create_titles
+
+
+def explain(params):
+    queryset = TitleFilter(params, queryset=Title.objects.all()).qs
+    if connection.vendor == 'postgresql':
+        # на маленькой тестовой таблице seq scan всегда дешевле
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+    return queryset.explain()
+
+
+class Test11TitleFilter:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_filters(self, client, user_client):
+        create_titles(user_client)
+        response = client.get('/api/v1/titles/?year_min=2000&year_max=2010')
+        assert len(response.json()['results']) == 1, \
+            'Проверьте, что `/api/v1/titles/` фильтруется по диапазону `year_min` и `year_max`'
+        response = client.get('/api/v1/titles/?year_min=2000')
+        assert len(response.json()['results']) == 2, \
+            'Проверьте, что `/api/v1/titles/` фильтруется по `year_min`'
+        response = client.get('/api/v1/titles/?year=20x0')
+        assert response.status_code == 400, \
+            'Проверьте, что при нечисловом `year` возвращается статус 400'
+        response = client.get('/api/v1/titles/?genre=HORROR&category=Films')
+        assert len(response.json()['results']) == 1, \
+            'Проверьте, что фильтры `genre` и `category` не зависят от регистра'
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.skipif(
+        connection.vendor not in ('postgresql', 'sqlite'),
+        reason='проверка плана запроса есть только для Postgres и SQLite'
+    )
+    @pytest.mark.parametrize('params, index', [
+        ({'category': 'films', 'year': '2000'}, 'title_category_year_idx'),
+        ({'genre': 'drama'}, 'genre_title_idx'),
+        ({'year_min': '1990', 'year_max': '2000'}, 'api_title_year'),
+    ])
+    def test_02_index_usage(self, params, index):
+        plan = explain(params)
+        assert index in plan, \
+            f'Проверьте, что фильтр {params} использует индекс {index}:\n{plan}'
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('url', ['/api/v1/categories/', '/api/v1/genres/'])
+    def test_03_slug_unique_ignores_case(self, user_client, url):
+        user_client.post(url, data={'name': 'Фильм', 'slug': 'films'})
+        response = user_client.post(url, data={'name': 'Фильм', 'slug': 'Films'})
+        assert response.status_code == 400, \
+            f'Проверьте, что при POST запросе `{url}` slug, отличающийся только регистром, возвращает статус 400'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_admin_title_genres(self, client, admin):
+        client.force_login(admin)
+        response = client.get('/admin/api/title/add/')
+        assert response.status_code == 200
+        assert 'genretitle_set-TOTAL_FORMS' in response.content.decode(), \
+            'Проверьте, что в админке произведения можно задать жанры'
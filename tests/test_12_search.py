@@ -0,0 +1,57 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Title
+from api.search import setup_search
+
+from .common import create_titles
+
+
+def search(client, query):
+    response = client.get('/api/v1/titles/', {'search': query})
+    assert response.status_code == 200, \
+        'Проверьте, что при GET запросе `/api/v1/titles/?search=` возвращается статус 200'
+    return [title['name'] for title in response.json()['results']]
+
+
+class Test12TitleSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_search(self, client, user_client):
+        create_titles(user_client)
+        Title.objects.create(name='Проектор', year=2001)
+        names = search(client, 'Проект')
+        assert names[:2] == ['Проект', 'Проектор'], \
+            'Проверьте, что поиск ранжирует точное совпадение выше частичного'
+        assert 'Поворот туда' not in names, \
+            'Проверьте, что поиск не возвращает нерелевантные произведения'
+        assert search(client, 'поварот') == ['Поворот туда'], \
+            'Проверьте, что поиск находит произведение при опечатке в запросе'
+        assert search(client, 'пике') == ['Поворот туда'], \
+            'Проверьте, что поиск учитывает описание произведения'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_search_index_follows_writes(self, client, user_client):
+        titles, _, _ = create_titles(user_client)
+        user_client.patch(f'/api/v1/titles/{titles[1]["id"]}/', data={'name': 'Мастер'})
+        assert search(client, 'мастер') == ['Мастер'], \
+            'Проверьте, что поиск находит произведение по новому названию'
+        assert search(client, 'Проект') == [], \
+            'Проверьте, что поиск не находит произведение по старому названию'
+        user_client.delete(f'/api/v1/titles/{titles[1]["id"]}/')
+        assert search(client, 'мастер') == [], \
+            'Проверьте, что удалённое произведение не находится поиском'
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.skipif(connection.vendor != 'sqlite', reason='только для SQLite')
+    def test_03_old_sqlite(self, client, user_client, monkeypatch):
+        create_titles(user_client)
+        # до 3.34 у FTS5 нет токенизатора trigram
+        monkeypatch.setattr(connection.Database, 'sqlite_version_info', (3, 31, 1))
+        with CaptureQueriesContext(connection) as queries:
+            setup_search()
+        assert not queries.captured_queries, \
+            'Проверьте, что на SQLite без trigram индекс поиска не создаётся'
+        assert search(client, 'Проект') == ['Проект'], \
+            'Проверьте, что на старом SQLite поиск работает через `icontains`'
@@ -0,0 +1,86 @@
+import pytest
+
+from api.autocomplete import PrefixIndex, index
+from api.cache import bump_version
+from api.models import Title
+
+from .common import create_titles
+
+
+class Test13Autocomplete:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_autocomplete(self, client, user_client):
+        titles, categories, genres = create_titles(user_client)
+        response = client.get('/api/v1/autocomplete/?q=пов')
+        assert response.status_code == 200, \
+            'Проверьте, что при GET запросе `/api/v1/autocomplete/?q=` возвращается статус 200'
+        assert response.json() == [{'type': 'title', 'id': titles[0]['id'], 'name': 'Поворот туда'}], \
+            'Проверьте, что автодополнение находит произведения по началу названия'
+        names = [item['name'] for item in client.get('/api/v1/autocomplete/?q=ту').json()]
+        assert names == ['Поворот туда'], \
+            'Проверьте, что автодополнение находит произведения по началу любого слова'
+        response = client.get('/api/v1/autocomplete/?q=дра')
+        assert [item['slug'] for item in response.json()] == ['drama'], \
+            'Проверьте, что автодополнение находит жанры'
+        response = client.get('/api/v1/autocomplete/?q=кни')
+        assert [item['slug'] for item in response.json()] == ['books'], \
+            'Проверьте, что автодополнение находит категории'
+        response = client.get('/api/v1/autocomplete/')
+        assert response.status_code == 400, \
+            'Проверьте, что без параметра `q` возвращается статус 400'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_incremental_updates(self, client, user_client, django_assert_num_queries):
+        titles, _, _ = create_titles(user_client)
+        client.get('/api/v1/autocomplete/?q=пр')
+        user_client.patch(f'/api/v1/titles/{titles[1]["id"]}/', data={'name': 'Мастер'})
+        # индекс обновлён на месте, в базу за подсказками не ходим
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/autocomplete/?q=мас')
+        assert [item['name'] for item in response.json()] == ['Мастер'], \
+            'Проверьте, что индекс автодополнения обновляется при изменении произведения'
+        assert client.get('/api/v1/autocomplete/?q=проект').json() == [], \
+            'Проверьте, что старое название удаляется из индекса автодополнения'
+        user_client.delete(f'/api/v1/titles/{titles[1]["id"]}/')
+        assert client.get('/api/v1/autocomplete/?q=мас').json() == [], \
+            'Проверьте, что удалённое произведение удаляется из индекса автодополнения'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_rebuild_on_foreign_writes(self):
+        index.build()
+        # запись в другом процессе: строка в базе и новая версия индекса
+        Title.objects.bulk_create([Title(name='Чужое', year=2000)])
+        bump_version('autocomplete')
+        assert [item['name'] for item in index.search('чуж')] == ['Чужое'], \
+            'Проверьте, что индекс перестраивается, если его версия изменилась в другом процессе'
+
+    def test_04_prefix_index_order(self):
+        prefix_index = PrefixIndex()
+        prefix_index.ensure_fresh = lambda: None
+        for pk, name in enumerate(('Бета', 'Альфа', 'Альфа Бета')):
+            prefix_index.add('title', Title(id=pk, name=name))
+        assert [item['id'] for item in prefix_index.search('б', 10)] == [0, 2], \
+            'Проверьте, что подсказки отсортированы и не повторяются'
+        assert [item['id'] for item in prefix_index.search('а', 1)] == [1], \
+            'Проверьте, что количество подсказок ограничено параметром `limit`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_sync_from_log(self, user_client, django_assert_num_queries):
+        titles, categories, genres = create_titles(user_client)
+        # индекс другого процесса: чужие записи он видит только через журнал
+        worker_index = PrefixIndex()
+        worker_index.build()
+        user_client.patch(f'/api/v1/titles/{titles[1]["id"]}/', data={'name': 'Мастер'})
+        user_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        item = {'name': 'Массовое', 'year': 2000, 'category': categories[0]['slug'], 'genre': [genres[0]['slug']]}
+        user_client.post('/api/v1/titles/bulk/', data=[item], format='json')
+        # перечитываются только изменённые произведения, без перестройки индекса
+        with django_assert_num_queries(1):
+            names = [item['name'] for item in worker_index.search('мас')]
+        assert names == ['Массовое', 'Мастер'] and worker_index.search('пов') == [], \
+            'Проверьте, что индекс другого процесса перечитывает изменённые записи по журналу'
+        bump_version('autocomplete')
+        # после сброса версии журнал не продолжается - индекс строится заново
+        with django_assert_num_queries(3):
+            worker_index.search('мас')
@@ -0,0 +1,40 @@
+import pytest
+
+from .common import create_comments, create_titles
+
+
+class Test14SparseFields:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_fields(self, client, user_client, django_assert_num_queries):
+        titles, _, _ = create_titles(user_client)
+        # count + страница: без жанров и категорий
+        with django_assert_num_queries(2):
+            response = client.get('/api/v1/titles/?fields=id,name,rating&count=exact')
+        assert response.status_code == 200, \
+            'Проверьте, что при GET запросе `/api/v1/titles/?fields=` возвращается статус 200'
+        assert response.json()['results'][0] == {'id': titles[0]['id'], 'name': titles[0]['name'], 'rating': None}, \
+            'Проверьте, что `?fields=` оставляет в ответе только перечисленные поля'
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/?omit=description,genre')
+        assert set(response.json()) == {'id', 'name', 'year', 'rating', 'category'}, \
+            'Проверьте, что `?omit=` убирает перечисленные поля из ответа'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_and_comments_fields(self, client, user_client, admin, django_assert_num_queries):
+        comments, reviews, titles, _, _ = create_comments(user_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(f'{url}?fields=id,score')
+        assert response.json()['results'][0] == {'id': reviews[2]['id'], 'score': reviews[2]['score']}, \
+            'Проверьте, что `?fields=` работает для отзывов'
+        response = client.get(f'{url}{reviews[0]["id"]}/comments/?omit=text')
+        assert set(response.json()['results'][0]) == {'id', 'author', 'pub_date'}, \
+            'Проверьте, что `?omit=` работает для комментариев'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_writes_ignore_fields(self, user_client):
+        titles, categories, genres = create_titles(user_client)
+        response = user_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/?fields=id', data={'name': 'Новое'}
+        )
+        assert response.json()['name'] == 'Новое' and 'genre' in response.json(), \
+            'Проверьте, что `?fields=` не влияет на ответ при записи'
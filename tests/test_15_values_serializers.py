@@ -0,0 +1,43 @@
+import pytest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from api.models import Comment, Review, Title
+from api.serializers import (CommentSerializer, CommentValuesSerializer,
+                             ReviewSerializer, ReviewValuesSerializer,
+                             TitleListSerializer, TitleValuesSerializer)
+
+from .common import create_comments
+
+CASES = (
+    (TitleListSerializer, TitleValuesSerializer, Title.objects.order_by('id')),
+    (ReviewSerializer, ReviewValuesSerializer, Review.objects.all()),
+    (CommentSerializer, CommentValuesSerializer, Comment.objects.all()),
+)
+
+
+def render(serializer_class, values_serializer_class, queryset, query=''):
+    request = APIView().initialize_request(APIRequestFactory().get(f'/{query}'))
+    model_data = serializer_class(queryset, many=True, context={'request': request}).data
+    values_serializer = values_serializer_class(request)
+    values_data = values_serializer.to_representation(
+        queryset.values(*values_serializer.get_columns())
+    )
+    return JSONRenderer().render(model_data), JSONRenderer().render(values_data)
+
+
+class Test15ValuesSerializers:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('query', ['', '?fields=id,genre,pub_date', '?omit=category,author'])
+    def test_01_same_json(self, user_client, admin, query):
+        create_comments(user_client, admin)
+        Title.objects.create(name='Без категории', year=1999)
+        for serializer_class, values_serializer_class, queryset in CASES:
+            model_json, values_json = render(
+                serializer_class, values_serializer_class, queryset.all(), query
+            )
+            assert model_json == values_json, \
+                f'Проверьте, что {values_serializer_class.__name__} ' \
+                f'возвращает тот же JSON, что и {serializer_class.__name__}'
@@ -0,0 +1,67 @@
+import pytest
+from django.db import transaction
+
+from api.models import Review
+
+from .common import create_reviews, create_titles
+
+
+class Test16ConditionalGet:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('url', [
+        '/api/v1/titles/', '/api/v1/categories/', '/api/v1/genres/'
+    ])
+    def test_01_not_modified(self, client, user_client, django_assert_num_queries, url):
+        create_titles(user_client)
+        response = client.get(url)
+        etag = response.get('ETag')
+        assert etag and response.has_header('Last-Modified'), \
+            f'Проверьте, что `{url}` возвращает заголовки `ETag` и `Last-Modified`'
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, \
+            f'Проверьте, что `{url}` с актуальным `If-None-Match` возвращает статус 304 без запросов к базе'
+        response = client.get(f'{url}?search=drama', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Проверьте, что `ETag` зависит от параметров запроса'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_writes_change_etag(self, client, user_client, admin):
+        reviews, titles, _, _ = create_reviews(user_client, admin)
+        title_id = titles[0]['id']
+        urls = ['/api/v1/titles/', f'/api/v1/titles/{title_id}/']
+        etags = {url: client.get(url)['ETag'] for url in urls}
+        other = client.get(f'/api/v1/titles/{titles[1]["id"]}/')['ETag']
+        user_client.patch(
+            f'/api/v1/titles/{title_id}/reviews/{reviews[0]["id"]}/',
+            data={'score': 10}
+        )
+        for url in urls:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            assert response.status_code == 200, \
+                f'Проверьте, что изменение отзыва меняет `ETag` `{url}`'
+            etags[url] = response['ETag']
+        response = client.get(f'/api/v1/titles/{titles[1]["id"]}/', HTTP_IF_NONE_MATCH=other)
+        assert response.status_code == 304, \
+            'Проверьте, что отзыв меняет `ETag` только своего произведения'
+        user_client.patch(urls[1], data={'genre': ['comedy']})
+        response = client.get(urls[1], HTTP_IF_NONE_MATCH=etags[urls[1]])
+        assert response.status_code == 200, \
+            'Проверьте, что изменение жанров произведения меняет его `ETag`'
+        etag = client.get('/api/v1/categories/')['ETag']
+        user_client.post('/api/v1/categories/', data={'name': 'Музыка', 'slug': 'music'})
+        response = client.get('/api/v1/categories/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Проверьте, что добавление категории меняет `ETag` списка категорий'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_etag_after_commit(self, client, user_client, admin):
+        titles, _, _ = create_titles(user_client)
+        with transaction.atomic():
+            Review.objects.create(title_id=titles[0]['id'], author=admin, text='Текст', score=8)
+            # ETag, выданный во время записи, описывает данные до фиксации
+            etag = client.get('/api/v1/titles/')['ETag']
+        response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Проверьте, что `ETag` списка меняется после фиксации записи'
@@ -0,0 +1,60 @@
+import pytest
+
+from api.models import Category
+
+from .common import create_categories, create_genre
+
+
+class Test17ListCache:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('url,create', [
+        ('/api/v1/categories/', create_categories),
+        ('/api/v1/genres/', create_genre),
+    ])
+    def test_01_cached_list(self, client, user_client, django_assert_num_queries, url, create):
+        items = create(user_client)
+        expected = client.get(url).json()
+        with django_assert_num_queries(0):
+            response = client.get(url)
+        assert response.json() == expected, \
+            f'Проверьте, что повторный GET `{url}` отдаётся из кэша без запросов к базе'
+        slug = items[0]['slug']
+        found = client.get(f'{url}?search={items[0]["name"]}').json()
+        assert [item['slug'] for item in found['results']] == [slug], \
+            'Проверьте, что ответы с разными параметрами кэшируются отдельно'
+        user_client.delete(f'{url}{slug}/')
+        response = client.get(url)
+        assert response.json()['count'] == expected['count'] - 1, \
+            f'Проверьте, что удаление через API сбрасывает кэш `{url}`'
+        response = client.get(f'{url}?search={items[0]["name"]}')
+        assert response.json()['results'] == [], \
+            'Проверьте, что удаление сбрасывает кэш для всех параметров запроса'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_orm_writes_invalidate(self, client, user_client):
+        create_categories(user_client)
+        count = client.get('/api/v1/categories/').json()['count']
+        # так же сохраняет объект админка
+        category = Category.objects.create(name='Музыка', slug='music')
+        assert client.get('/api/v1/categories/').json()['count'] == count + 1, \
+            'Проверьте, что сохранение категории вне API сбрасывает кэш списка'
+        category.name = 'Песни'
+        category.save()
+        names = [item['name'] for item in client.get('/api/v1/categories/').json()['results']]
+        assert 'Песни' in names, \
+            'Проверьте, что изменение категории сбрасывает кэш списка'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_links_per_host(self, client):
+        Category.objects.bulk_create(
+            Category(name=f'Категория {i}', slug=f'category-{i}') for i in range(15)
+        )
+        client.get('/api/v1/categories/', HTTP_HOST='internal.local')
+        response = client.get('/api/v1/categories/', HTTP_HOST='api.example.com')
+        assert response.json()['next'].startswith('http://api.example.com/'), \
+            'Проверьте, что ссылки пагинации в кэше не берутся из запроса с другим `Host`'
+        etag = client.get('/api/v1/categories/', HTTP_HOST='internal.local')['ETag']
+        response = client.get('/api/v1/categories/', HTTP_HOST='api.example.com', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Проверьте, что ETag различается для разных `Host`'
@@ -0,0 +1,89 @@
+import pytest
+from django.db import transaction
+
+from api.cache import get_version, title_cache
+from api.models import Category, Genre, Title
+
+from .common import auth_client, create_titles, create_users_api
+
+
+class Test18TitleCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_hit_and_miss(self, client, user_client, django_assert_num_queries):
+        titles, _, _ = create_titles(user_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        hits, misses = title_cache.hits, title_cache.misses
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS', \
+            'Проверьте, что первый запрос карточки произведения возвращает `X-Cache: MISS`'
+        with django_assert_num_queries(0):
+            cached = client.get(url)
+        assert cached['X-Cache'] == 'HIT' and cached.json() == response.json(), \
+            'Проверьте, что повторный запрос карточки отдаётся из кэша без запросов к базе'
+        assert (title_cache.hits - hits, title_cache.misses - misses) == (1, 1), \
+            'Проверьте счётчики попаданий и промахов кэша карточек'
+        response = client.get(f'{url}?fields=id,name')
+        assert response['X-Cache'] == 'HIT' and response.json() == {'id': titles[0]['id'], 'name': titles[0]['name']}, \
+            'Проверьте, что `?fields=` применяется к карточке из кэша'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_invalidation(self, client, user_client):
+        titles, categories, genres = create_titles(user_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+
+        def fetch():
+            return client.get(url).json()
+
+        fetch()
+        user_client.patch(url, data={'name': 'Новое имя'})
+        assert fetch()['name'] == 'Новое имя', \
+            'Проверьте, что изменение произведения сбрасывает его карточку в кэше'
+        user_client.patch(url, data={'genre': [genres[2]['slug']]})
+        assert [genre['slug'] for genre in fetch()['genre']] == [genres[2]['slug']], \
+            'Проверьте, что изменение жанров сбрасывает карточку в кэше'
+        genre = Genre.objects.get(slug=genres[2]['slug'])
+        genre.name = 'Переименованный жанр'
+        genre.save()
+        assert fetch()['genre'][0]['name'] == 'Переименованный жанр', \
+            'Проверьте, что изменение жанра сбрасывает карточки его произведений'
+        category = Category.objects.get(slug=categories[0]['slug'])
+        category.name = 'Переименованная категория'
+        category.save()
+        assert fetch()['category']['name'] == 'Переименованная категория', \
+            'Проверьте, что изменение категории сбрасывает карточки её произведений'
+        user, _ = create_users_api(user_client)
+        auth_client(user).post(f'{url}reviews/', data={'text': 'Текст', 'score': 7})
+        assert fetch()['rating'] == 7, \
+            'Проверьте, что новый отзыв сбрасывает карточку произведения в кэше'
+        category.delete()
+        assert fetch()['category'] is None, \
+            'Проверьте, что удаление категории сбрасывает карточки её произведений'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_stale_store_before_commit(self, client, user_client):
+        titles, _, _ = create_titles(user_client)
+        pk = titles[0]['id']
+        url = f'/api/v1/titles/{pk}/'
+        old = client.get(url).json()
+        with transaction.atomic():
+            title = Title.objects.get(pk=pk)
+            title.name = 'После фиксации'
+            title.save()
+            # параллельный запрос посчитал карточку до фиксации и кладёт
+            # её в кэш уже после сброса
+            versions = [get_version(name) for name in (f'title:{pk}', 'categories', 'genres')]
+            title_cache.get_or_set(pk, versions, lambda: old)
+        assert client.get(url).json()['name'] == 'После фиксации', \
+            'Проверьте, что карточка, посчитанная до фиксации записи, не отдаётся после неё'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_metrics_endpoint(self, client, user_client):
+        titles, _, _ = create_titles(user_client)
+        client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        response = user_client.get('/api/v1/metrics/title-cache/')
+        assert response.status_code == 200 and response.json() == title_cache.stats(), \
+            'Проверьте, что `/api/v1/metrics/title-cache/` отдаёт счётчики кэша карточек администратору'
+        response = client.get('/api/v1/metrics/title-cache/')
+        assert response.status_code == 401, \
+            'Проверьте, что метрики кэша недоступны анонимному пользователю'
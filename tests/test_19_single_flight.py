@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from django.db import transaction
+
+from api.cache import SingleFlight
+from api.models import Review, Title
+
+from .common import create_titles
+
+
+class Test19SingleFlight:
+
+    def test_01_coalesced_miss(self):
+        flight = SingleFlight()
+        calls = []
+        started = threading.Barrier(8)
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'значение'
+
+        def worker():
+            started.wait()
+            results.append(flight.get_or_set('api:test:coalesced', compute, 60))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1, \
+            'Проверьте, что одновременные промахи по одному ключу вычисляют значение один раз'
+        assert {value for value, _ in results} == {'значение'}, \
+            'Проверьте, что ожидающие запросы получают значение вычислителя'
+
+    def test_02_stale_while_revalidate(self):
+        flight = SingleFlight()
+        flight.get_or_set('api:test:stale', lambda: 'старое', 0, 60)
+        release = threading.Event()
+        results = []
+
+        def compute():
+            release.wait(5)
+            return 'новое'
+
+        refresher = threading.Thread(target=lambda: results.append(
+            flight.get_or_set('api:test:stale', compute, 60, 60)
+        ))
+        refresher.start()
+        time.sleep(0.05)
+        assert flight.get_or_set('api:test:stale', compute, 60, 60) == ('старое', SingleFlight.STALE), \
+            'Проверьте, что во время пересчёта отдаётся устаревшее значение'
+        release.set()
+        refresher.join()
+        assert results == [('новое', SingleFlight.MISS)], \
+            'Проверьте, что устаревшее значение пересчитывает один запрос'
+        assert flight.get_or_set('api:test:stale', compute, 60, 60) == ('новое', SingleFlight.HIT), \
+            'Проверьте, что пересчитанное значение сохраняется в кэше'
+
+    def test_03_other_worker_lock(self):
+        flight = SingleFlight(poll_interval=0.01)
+        # блокировку держит другой воркер, он же затем сохраняет значение
+        cache.add('api:test:locked:lock', 'чужой', 30)
+        threading.Timer(0.1, lambda: cache.set(
+            'api:test:locked', ('от воркера', time.time() + 60)
+        )).start()
+        value, _ = flight.get_or_set('api:test:locked', lambda: 'своё', 60)
+        assert value == 'от воркера', \
+            'Проверьте, что при чужой блокировке значение берётся из общего кэша'
+        assert cache.get('api:test:locked:lock') == 'чужой', \
+            'Проверьте, что чужая блокировка не снимается'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_title_list_cache(self, client, django_assert_num_queries):
+        client.get('/api/v1/titles/')
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'HIT', \
+            'Проверьте, что повторный запрос списка произведений отдаётся из кэша'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_list_filled_before_commit(self, client, user_client, admin):
+        titles, _, _ = create_titles(user_client)
+        with transaction.atomic():
+            Review.objects.create(title_id=titles[0]['id'], author=admin, text='Текст', score=8)
+            # параллельный запрос заполняет кэш списка до фиксации записи
+            client.get('/api/v1/titles/')
+        response = client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS', \
+            'Проверьте, что список, закэшированный до фиксации записи, не отдаётся после неё'
+        rating = {title['id']: title['rating'] for title in response.json()['results']}
+        assert rating[titles[0]['id']] == Title.objects.get(pk=titles[0]['id']).rating == 8, \
+            'Проверьте, что после фиксации список содержит новый рейтинг'
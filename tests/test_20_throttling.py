@@ -0,0 +1,63 @@
+import pytest
+
+from api.throttling import AnonSlidingWindowThrottle, AutocompleteThrottle
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [6000.0]
+    monkeypatch.setattr(AnonSlidingWindowThrottle, 'THROTTLE_RATES', {'anon': '10/min'})
+    monkeypatch.setattr(AnonSlidingWindowThrottle, 'timer', lambda self: now[0])
+    return now
+
+
+class Test20Throttling:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_sliding_window(self, client, clock):
+        statuses = [
+            client.get('/api/v1/categories/', REMOTE_ADDR='10.0.20.1').status_code
+            for _ in range(11)
+        ]
+        assert statuses == [200] * 10 + [429], \
+            'Проверьте, что анонимный лимит срабатывает после исчерпания запросов окна'
+        clock[0] += 60 * 1.5
+        # половина прошлого окна ещё в скользящем окне: 5 запросов из 10
+        statuses = [
+            client.get('/api/v1/categories/', REMOTE_ADDR='10.0.20.1').status_code
+            for _ in range(6)
+        ]
+        assert statuses == [200] * 5 + [429], \
+            'Проверьте, что прошлое окно учитывается пропорционально своей доле'
+        response = client.get('/api/v1/categories/', REMOTE_ADDR='10.0.20.1')
+        assert 0 < int(response['Retry-After']) <= 60, \
+            'Проверьте, что ответ 429 содержит `Retry-After`'
+        response = client.get('/api/v1/categories/', REMOTE_ADDR='10.0.20.2')
+        assert response.status_code == 200, \
+            'Проверьте, что лимит считается отдельно для каждого клиента'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_cost(self, client, clock):
+        statuses = [
+            client.get('/api/v1/titles/?search=тест', REMOTE_ADDR='10.0.20.3').status_code
+            for _ in range(3)
+        ]
+        assert statuses == [200, 200, 429], \
+            'Проверьте, что поиск произведений расходует лимит быстрее обычных запросов'
+        response = client.get('/api/v1/categories/', REMOTE_ADDR='10.0.20.3')
+        assert response.status_code == 429, \
+            'Проверьте, что поиск и обычные запросы расходуют общий лимит'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_autocomplete_scope(self, client, clock, monkeypatch):
+        monkeypatch.setattr(AutocompleteThrottle, 'THROTTLE_RATES', {'autocomplete': '3/min'})
+        monkeypatch.setattr(AutocompleteThrottle, 'timer', lambda self: clock[0])
+        statuses = [
+            client.get('/api/v1/autocomplete/?q=те', REMOTE_ADDR='10.0.20.4').status_code
+            for _ in range(4)
+        ]
+        assert statuses == [200, 200, 200, 429], \
+            'Проверьте, что у подсказок есть собственный лимит'
+        response = client.get('/api/v1/categories/', REMOTE_ADDR='10.0.20.4')
+        assert response.status_code == 200, \
+            'Проверьте, что подсказки не расходуют общий лимит'
@@ -0,0 +1,74 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.authentication import get_tokens_for_user
+from api.models import Category, Role
+
+from .common import create_users_api
+
+
+def token_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {get_tokens_for_user(user)["access"]}')
+    return client
+
+
+class Test21StatelessJWT:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_no_user_query(self, admin, user_client, django_assert_num_queries):
+        user, _ = create_users_api(user_client)
+        Category.objects.create(name='Фильм', slug='films')
+        admin_client = token_client(admin)
+        # count + страница, пользователь собран из токена
+        with django_assert_num_queries(2):
+            response = admin_client.get('/api/v1/users/')
+        assert response.status_code == 200, \
+            'Проверьте, что права суперпользователя берутся из утверждений токена'
+        with django_assert_num_queries(0):
+            response = token_client(user).get('/api/v1/users/')
+        assert response.status_code == 403, \
+            'Проверьте, что роль пользователя из токена учитывается без запроса к базе'
+        # запись сверяет пользователя с базой одним запросом
+        with django_assert_num_queries(1):
+            response = token_client(user).post('/api/v1/categories/', data={'name': 'Книга', 'slug': 'books'})
+        assert response.status_code == 403, \
+            'Проверьте, что обычный пользователь не может создавать категории'
+        response = token_client(user).get('/api/v1/users/me/')
+        assert response.json()['email'] == user.email, \
+            'Проверьте, что `/api/v1/users/me/` возвращает полные данные пользователя'
+        response = token_client(user).patch('/api/v1/users/me/', data={'bio': 'Новая биография'})
+        user.refresh_from_db()
+        assert (user.bio, user.email) == ('Новая биография', response.json()['email']), \
+            'Проверьте, что `/api/v1/users/me/` изменяет полного пользователя, не затирая остальные поля'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_revalidation(self, settings, user_client):
+        settings.STATELESS_JWT = {'REVALIDATE_TTL': 60}
+        user, _ = create_users_api(user_client)
+        client = token_client(user)
+        response = client.post('/api/v1/categories/', data={'name': 'Книга', 'slug': 'books'})
+        assert response.status_code == 403, \
+            'Проверьте, что обычный пользователь не может создавать категории'
+        user.role = Role.ADMIN
+        user.save()
+        response = client.post('/api/v1/categories/', data={'name': 'Книга', 'slug': 'books'})
+        assert response.status_code == 201, \
+            'Проверьте, что при сверке с базой смена роли видна до истечения токена'
+        user.delete()
+        response = client.get('/api/v1/categories/')
+        assert response.status_code == 401, \
+            'Проверьте, что токен удалённого пользователя отклоняется при сверке с базой'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_deleted_user_writes(self, user_client):
+        user, _ = create_users_api(user_client)
+        Category.objects.create(name='Фильм', slug='films')
+        client = token_client(user)
+        user.delete()
+        response = client.get('/api/v1/categories/')
+        assert response.status_code == 200, \
+            'Проверьте, что чтение по токену не сверяется с базой'
+        response = client.post('/api/v1/titles/1/reviews/', data={'text': 'Текст', 'score': 5})
+        assert response.status_code == 401, \
+            'Проверьте, что запись по токену удалённого пользователя возвращает статус 401'
@@ -0,0 +1,88 @@
+import csv
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from django.conf import settings
+from django.core.management import CommandError, call_command
+
+from api.models import Category, Comment, Genre, GenreTitle, Review, Title, User
+
+DATA_DIR = Path(settings.BASE_DIR) / 'data'
+
+
+def read_rows(name):
+    with open(DATA_DIR / f'{name}.csv', encoding='utf-8', newline='') as file:
+        return list(csv.DictReader(file))
+
+
+def count_rows(name):
+    return len(read_rows(name))
+
+
+class Test22ImportCSV:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_import(self, client):
+        out = StringIO()
+        call_command('import_csv', '--batch-size', '10', stdout=out)
+        assert Comment.objects.count() == count_rows('comments') \
+            and GenreTitle.objects.count() == count_rows('genre_title'), \
+            'Проверьте, что `import_csv` загружает все строки файлов'
+        # в review.csv есть повторные отзывы автора на то же произведение
+        reviews = read_rows('review')
+        unique = {(row['title_id'], row['author']) for row in reviews}
+        assert Review.objects.count() == len(unique), \
+            'Проверьте, что `import_csv` пропускает строки, нарушающие уникальность'
+        assert f'пропущено {len(reviews) - len(unique)}' in out.getvalue(), \
+            'Проверьте, что `import_csv` сообщает о пропущенных строках'
+        assert 'review: ' in out.getvalue() and 'строк/с' in out.getvalue(), \
+            'Проверьте, что `import_csv` выводит скорость загрузки'
+        review = Review.objects.get(pk=1)
+        assert review.pub_date.isoformat().startswith('2019-09-24T21:08:21'), \
+            'Проверьте, что дата публикации берётся из файла'
+        assert User.objects.get(username='bingobongo').pk == 100, \
+            'Проверьте, что id записей берутся из файла'
+        call_command('recalculate_ratings', '--check')
+        title = Title.objects.get(pk=review.title_id)
+        response = client.get(f'/api/v1/titles/{title.pk}/')
+        assert title.rating is not None and response.json()['rating'] == title.rating, \
+            'Проверьте, что после импорта рейтинги произведений пересчитаны'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reimport(self):
+        call_command('import_csv', stdout=StringIO())
+        Title.objects.filter(pk=1).update(name='Изменено')
+        out = StringIO()
+        call_command('import_csv', '--only', 'titles', stdout=out)
+        assert Title.objects.get(pk=1).name == 'Побег из Шоушенка', \
+            'Проверьте, что повторный импорт обновляет существующие записи'
+        assert f'обновлено {count_rows("titles")}' in out.getvalue(), \
+            'Проверьте, что повторный импорт не создаёт дубликаты'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_failed_file(self, tmp_path):
+        (tmp_path / 'users.csv').write_text(
+            (DATA_DIR / 'users.csv').read_text(encoding='utf-8'), encoding='utf-8'
+        )
+        (tmp_path / 'category.csv').write_text(
+            'id,name,slug\n1,Фильм,movie\nabc,Книга,book\n', encoding='utf-8'
+        )
+        with pytest.raises(CommandError, match='category.csv'):
+            call_command('import_csv', '--path', str(tmp_path), '--only', 'users', 'category',
+                         stdout=StringIO())
+        assert not User.objects.exists() and not Category.objects.exists(), \
+            'Проверьте, что при ошибке в одном из файлов `import_csv` не сохраняет остальные'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_slug_case(self, tmp_path):
+        (tmp_path / 'category.csv').write_text(
+            'id,name,slug\n1,Фильм,Movie\n', encoding='utf-8'
+        )
+        (tmp_path / 'genre.csv').write_text(
+            'id,name,slug\n1,Драма,DRAMA\n', encoding='utf-8'
+        )
+        call_command('import_csv', '--path', str(tmp_path), '--only', 'category', 'genre',
+                     stdout=StringIO())
+        assert Category.objects.get(pk=1).slug == 'movie' and Genre.objects.get(pk=1).slug == 'drama', \
+            'Проверьте, что `import_csv` приводит slug категорий и жанров к нижнему регистру'
@@ -0,0 +1,42 @@
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from api.models import Comment, Review, Title
+
+openpyxl = pytest.importorskip('openpyxl')
+
+
+class Test23ImportXLSX:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_dry_run(self):
+        out = StringIO()
+        call_command('import_xlsx', '--dry-run', stdout=out)
+        assert not Title.objects.exists(), \
+            'Проверьте, что `import_xlsx --dry-run` не сохраняет данные'
+        assert 'Titles: 32 строк' in out.getvalue() and 'строк/с' in out.getvalue(), \
+            'Проверьте, что `import_xlsx` выводит количество строк и скорость по каждому листу'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_import(self):
+        call_command('import_xlsx', '--batch-size', '20', stdout=StringIO())
+        assert (Title.objects.count(), Comment.objects.count()) == (32, 5), \
+            'Проверьте, что `import_xlsx` загружает листы книги'
+        title = Title.objects.get(pk=1)
+        assert (title.name, title.year, title.category_id) == ('Побег из Шоушенка', 1994, 1), \
+            'Проверьте, что числа из ячеек XLSX приводятся к целым'
+        assert Review.objects.filter(title=title).exists() and title.rating is not None, \
+            'Проверьте, что после импорта пересчитаны рейтинги'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_invalid_workbook(self, tmp_path):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.title = 'Titles'
+        sheet.append(['id', 'name', 'year', 'category'])
+        sheet.append([1, 'Без года', 'неизвестно', None])
+        workbook.save(tmp_path / 'broken.xlsx')
+        with pytest.raises(CommandError, match='строка 1'):
+            call_command('import_xlsx', str(tmp_path / 'broken.xlsx'), '--dry-run', stdout=StringIO())
@@ -0,0 +1,68 @@
+import csv
+import json
+from io import StringIO
+
+import pytest
+
+from api import export
+
+from .common import create_comments
+
+
+def read(response):
+    return b''.join(response.streaming_content).decode()
+
+
+class Test24Export:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_ndjson(self, client, user_client, admin):
+        _, reviews, titles, user, _ = create_comments(user_client, admin)
+        response = client.get('/api/v1/export/titles/')
+        assert response.status_code == 401, \
+            'Проверьте, что выгрузка недоступна анонимному пользователю'
+        response = user_client.get('/api/v1/export/titles/')
+        assert response.status_code == 200 and response.streaming, \
+            'Проверьте, что `/api/v1/export/titles/` отдаёт потоковый ответ администратору'
+        lines = [json.loads(line) for line in read(response).splitlines()]
+        expected = user_client.get('/api/v1/titles/').json()['results']
+        assert lines == expected, \
+            'Проверьте, что строки NDJSON совпадают с произведениями из `/api/v1/titles/`'
+        response = user_client.get('/api/v1/export/titles/?embed=comments&fields=id')
+        lines = [json.loads(line) for line in read(response).splitlines()]
+        first = lines[0]
+        assert set(first) == {'id', 'reviews'} and len(first['reviews']) == len(reviews), \
+            'Проверьте, что `?embed=` встраивает отзывы произведения'
+        assert first['reviews'][0]['comments'], \
+            'Проверьте, что `?embed=comments` встраивает комментарии отзывов'
+        response = user_client.get('/api/v1/export/titles/?output=xml')
+        assert response.status_code == 400, \
+            'Проверьте, что неизвестный формат выгрузки возвращает статус 400'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_csv(self, user_client, admin):
+        _, _, titles, _, _ = create_comments(user_client, admin)
+        response = user_client.get('/api/v1/export/titles/?output=csv')
+        assert response['Content-Type'].startswith('text/csv'), \
+            'Проверьте, что `?output=csv` отдаёт CSV'
+        rows = list(csv.DictReader(StringIO(read(response))))
+        assert [int(row['id']) for row in rows] == [title['id'] for title in titles], \
+            'Проверьте, что CSV содержит все произведения'
+        assert rows[0]['genre'] == ','.join(sorted(titles[0]['genre'])) \
+            and rows[0]['category'] == titles[0]['category'], \
+            'Проверьте, что жанры и категория выгружаются в CSV слагами'
+        response = user_client.get('/api/v1/export/titles/?output=csv&embed=reviews')
+        assert response.status_code == 400, \
+            'Проверьте, что отзывы встраиваются только в NDJSON'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_embed_pages(self, user_client, admin, monkeypatch):
+        create_comments(user_client, admin)
+        url = '/api/v1/export/titles/?embed=comments'
+        expected = read(user_client.get(url))
+        # страницы по одной строке: границы страниц внутри произведения
+        # и отзыва не должны менять результат
+        monkeypatch.setattr(export, 'EMBED_PAGE_SIZE', 1)
+        monkeypatch.setattr(export, 'WRITE_BUFFER_SIZE', 1)
+        assert read(user_client.get(url)) == expected, \
+            'Проверьте, что отзывы и комментарии выгружаются постранично без потерь'
@@ -0,0 +1,84 @@
+import pytest
+
+from api.models import Title
+
+from .common import create_titles
+
+
+class Test25BulkTitles:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_bulk_create(self, client, user_client, django_assert_max_num_queries):
+        titles, categories, genres = create_titles(user_client)
+        items = [
+            {'name': f'Пачка {i}', 'year': 2000 + i % 20, 'category': categories[i % 2]['slug'],
+             'genre': [genres[0]['slug'], genres[i % 3]['slug']], 'description': 'описание'}
+            for i in range(300)
+        ]
+        items.append({
+            'id': titles[0]['id'], 'name': 'Обновлено', 'year': 1999,
+            'category': categories[1]['slug'], 'genre': [genres[2]['slug']]
+        })
+        # пользователь, slug, проверка id, вставки пачками и max(id)
+        # по лимиту параметров SQLite, обновление и связи жанров -
+        # без запросов на каждый элемент
+        with django_assert_max_num_queries(16):
+            response = user_client.post('/api/v1/titles/bulk/', data=items, format='json')
+        assert response.status_code == 201, \
+            'Проверьте, что POST `/api/v1/titles/bulk/` возвращает статус 201'
+        data = response.json()
+        assert len(data) == 301 and Title.objects.count() == 302, \
+            'Проверьте, что `/api/v1/titles/bulk/` создаёт все произведения'
+        for item in (data[5], data[-1]):
+            assert client.get(f'/api/v1/titles/{item["id"]}/').json() == item, \
+                'Проверьте, что ответ `/api/v1/titles/bulk/` совпадает с карточками произведений'
+        assert data[-1]['name'] == 'Обновлено' \
+            and [genre['slug'] for genre in data[-1]['genre']] == [genres[2]['slug']], \
+            'Проверьте, что элементы с `id` обновляют существующие произведения'
+        response = client.get('/api/v1/titles/?name=Пачка')
+        assert response.json()['count'] == 300, \
+            'Проверьте, что после массовой записи кэши списков сброшены'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_all_or_nothing(self, client, user_client):
+        titles, categories, genres = create_titles(user_client)
+        items = [
+            {'name': 'Верное', 'year': 2000, 'category': categories[0]['slug'], 'genre': [genres[0]['slug']]},
+            {'name': 'Неверное', 'year': 2000, 'category': 'missing', 'genre': ['missing', 1]},
+            {'id': 9999, 'name': 'Чужое', 'year': 3000, 'category': categories[0]['slug'], 'genre': []},
+        ]
+        response = user_client.post('/api/v1/titles/bulk/', data=items, format='json')
+        assert response.status_code == 400, \
+            'Проверьте, что при ошибке в любом элементе возвращается статус 400'
+        errors = response.json()
+        assert errors[0] == {} and set(errors[1]) == {'category', 'genre'} \
+            and set(errors[2]) == {'id', 'year'}, \
+            'Проверьте, что ошибки возвращаются по каждому элементу'
+        assert Title.objects.count() == 2, \
+            'Проверьте, что при ошибке ничего не сохраняется'
+        items = [
+            {'id': pk, 'name': 'Дубль', 'year': 2000, 'category': categories[0]['slug'], 'genre': [genres[0]['slug']]}
+            for pk in (titles[0]['id'], titles[1]['id'], titles[0]['id'])
+        ]
+        response = user_client.post('/api/v1/titles/bulk/', data=items, format='json')
+        assert response.status_code == 400 and set(response.json()[0]) == {'id'} \
+            and response.json()[1] == {} and set(response.json()[2]) == {'id'}, \
+            'Проверьте, что повторяющийся `id` возвращает ошибку в каждом таком элементе'
+        response = client.post('/api/v1/titles/bulk/', data=items[:1], content_type='application/json')
+        assert response.status_code == 401, \
+            'Проверьте, что массовая запись недоступна анонимному пользователю'
+        response = user_client.post('/api/v1/titles/bulk/', data={}, format='json')
+        assert response.status_code == 400, \
+            'Проверьте, что `/api/v1/titles/bulk/` принимает только список'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_deleted_id_not_reused(self, user_client):
+        titles, categories, genres = create_titles(user_client)
+        item = {'name': 'Новое', 'year': 2000, 'category': categories[0]['slug'], 'genre': [genres[0]['slug']]}
+        response = user_client.post('/api/v1/titles/bulk/', data=[item, item], format='json')
+        deleted = response.json()[-1]['id']
+        Title.objects.filter(id=deleted).delete()
+        response = user_client.post('/api/v1/titles/bulk/', data=[item], format='json')
+        data = response.json()
+        assert data[0]['id'] > deleted and Title.objects.get(id=data[0]['id']).name == 'Новое', \
+            'Проверьте, что `/api/v1/titles/bulk/` не выдаёт id удалённых произведений повторно'
@@ -0,0 +1,54 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Genre
+
+from .common import create_categories, create_genre
+
+
+def post_title(user_client, category, genres):
+    data = {'name': 'Произведение', 'year': 2000, 'category': category, 'genre': genres}
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.post('/api/v1/titles/', data=data)
+    assert response.status_code == 201, \
+        'Проверьте, что POST `/api/v1/titles/` создаёт произведение'
+    return response, queries
+
+
+class Test26SlugCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_constant_queries(self, client, user_client):
+        genres = [genre['slug'] for genre in create_genre(user_client)]
+        category = create_categories(user_client)[0]['slug']
+        post_title(user_client, category, genres)
+        _, one = post_title(user_client, category, genres[:1])
+        response, many = post_title(user_client, category, genres)
+        assert len(one) == len(many), \
+            'Проверьте, что число запросов при записи произведения не зависит от числа жанров'
+        assert not any('"api_genre"' in query['sql'] or '"api_category"' in query['sql']
+                       for query in many.captured_queries), \
+            'Проверьте, что slug категорий и жанров берутся из кэша без запросов к базе'
+        data = response.json()
+        assert 'rating' in data and data == client.get(f'/api/v1/titles/{data["id"]}/').json(), \
+            'Проверьте, что ответ на запись совпадает с карточкой произведения'
+        response = user_client.patch(f'/api/v1/titles/{data["id"]}/', data={'name': 'Новое'})
+        assert [genre['slug'] for genre in response.json()['genre']] == sorted(genres), \
+            'Проверьте, что частичное обновление без жанров возвращает текущие жанры'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_invalidation(self, user_client):
+        genres = [genre['slug'] for genre in create_genre(user_client)]
+        category = create_categories(user_client)[0]['slug']
+        post_title(user_client, category, genres[:1])
+        genre = Genre.objects.get(slug=genres[0])
+        genre.slug = 'renamed'
+        genre.save()
+        data = {'name': 'Произведение', 'year': 2000, 'category': category, 'genre': [genres[0], 1]}
+        response = user_client.post('/api/v1/titles/', data=data, format='json')
+        assert response.status_code == 400 and set(response.json()['genre']) == {'0', '1'}, \
+            'Проверьте, что после изменения жанра старый slug больше не принимается'
+        response, _ = post_title(user_client, category, ['renamed'])
+        assert response.json()['genre'] == [{'name': genre.name, 'slug': 'renamed'}], \
+            'Проверьте, что изменение жанра сбрасывает кэш slug'
@@ -0,0 +1,81 @@
+from io import StringIO
+
+import pytest
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+from api import outbox
+from api.models import OutboxMessage, OutboxStatus
+from api.outbox import OutboxSender, enqueue_mail
+
+
+class FailingBackend(EmailBackend):
+    failures = 0
+
+    def send_messages(self, messages):
+        if FailingBackend.failures:
+            FailingBackend.failures -= 1
+            raise ConnectionError('сервер недоступен')
+        return super().send_messages(messages)
+
+
+class Test27Outbox:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_enqueues(self, client, monkeypatch):
+        connections = []
+
+        def counting_connection(**kwargs):
+            connections.append(kwargs)
+            return get_connection(**kwargs)
+
+        monkeypatch.setattr(outbox, 'get_connection', counting_connection)
+        for i in range(3):
+            response = client.post('/api/v1/auth/email/', data={'email': f'user{i}@yamdb.fake'})
+            assert response.status_code == 200, \
+                'Проверьте, что POST `/api/v1/auth/email/` возвращает статус 200'
+        assert not mail.outbox and OutboxMessage.objects.filter(status=OutboxStatus.PENDING).count() == 3, \
+            'Проверьте, что регистрация записывает письмо в outbox, а не отправляет его сразу'
+        out = StringIO()
+        call_command('send_outbox', '--once', '--batch-size', '2', stdout=out)
+        assert sorted(message.to[0] for message in mail.outbox) == [f'user{i}@yamdb.fake' for i in range(3)], \
+            'Проверьте, что `send_outbox` отправляет письма из outbox'
+        assert 'Отправлено: 3' in out.getvalue() and len(connections) == 1, \
+            'Проверьте, что `send_outbox` отправляет все пачки через одно соединение'
+        assert not OutboxMessage.objects.exclude(status=OutboxStatus.SENT).exists(), \
+            'Проверьте, что отправленные письма помечаются отправленными'
+        call_command('send_outbox', '--once', stdout=StringIO())
+        assert len(mail.outbox) == 3, \
+            'Проверьте, что письмо не отправляется повторно'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_retries(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_27_outbox.FailingBackend'
+        message = enqueue_mail('Тема', 'Текст', 'user@yamdb.fake')
+        FailingBackend.failures = 1
+        sender = OutboxSender(BACKOFF=60, MAX_ATTEMPTS=3)
+        assert sender.drain()['retried'] == 1 and not mail.outbox, \
+            'Проверьте, что неудачная отправка откладывается'
+        message.refresh_from_db()
+        assert message.status == OutboxStatus.PENDING and message.attempts == 1 \
+            and message.next_attempt_at > timezone.now() and 'сервер недоступен' in message.last_error, \
+            'Проверьте, что после ошибки следующая попытка назначается с задержкой'
+        assert sender.drain()['sent'] == 0, \
+            'Проверьте, что письмо не отправляется до истечения задержки'
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+        assert sender.drain()['sent'] == 1 and len(mail.outbox) == 1, \
+            'Проверьте, что после задержки письмо отправляется повторно'
+        assert [sender.get_delay(attempts) for attempts in (1, 2, 3)] == [60, 120, 240], \
+            'Проверьте, что задержка растёт экспоненциально'
+
+        failed = enqueue_mail('Тема', 'Текст', 'user@yamdb.fake')
+        FailingBackend.failures = 3
+        sender = OutboxSender(BACKOFF=0, MAX_ATTEMPTS=3)
+        assert sender.drain()['failed'] == 1, \
+            'Проверьте, что после MAX_ATTEMPTS попыток письмо помечается неотправленным'
+        failed.refresh_from_db()
+        assert (failed.status, failed.attempts) == (OutboxStatus.FAILED, 3), \
+            'Проверьте, что неотправленное письмо больше не повторяется'
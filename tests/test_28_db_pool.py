@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+from django.db.utils import ConnectionHandler
+
+from api_yamdb.db import health
+from api_yamdb.db.pool import ConnectionPool, PoolTimeout, pool_stats, pools
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pooled(tmp_path, django_db_blocker):
+    handler = ConnectionHandler({'default': {}, 'pooled': {
+        'ENGINE': 'api_yamdb.db.sqlite3',
+        'NAME': str(tmp_path / 'pooled.sqlite3'),
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': {'SIZE': 2, 'TIMEOUT': 0.1},
+    }})
+    with django_db_blocker.unblock():
+        yield handler
+        handler.close_all()
+        pools.pop('pooled').close_idle()
+
+
+class Test28DatabasePool:
+
+    def test_01_limits_and_metrics(self):
+        pool = ConnectionPool(size=2, timeout=0.05)
+        first, second = pool.checkout(FakeConnection), pool.checkout(FakeConnection)
+        with pytest.raises(PoolTimeout):
+            pool.checkout(FakeConnection)
+        stats = pool.stats()
+        assert (stats['in_use'], stats['timeouts'], stats['connects']) == (2, 1, 2), \
+            'Проверьте, что пул не выдаёт больше SIZE соединений и считает таймауты'
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(pool.checkout(FakeConnection)))
+        pool.timeout = 5
+        waiter.start()
+        while not pool.stats()['waiters']:
+            time.sleep(0.001)
+        pool.checkin(first)
+        waiter.join()
+        stats = pool.stats()
+        assert result == [first] and stats['connects'] == 2 and stats['waiters'] == 0, \
+            'Проверьте, что возвращённое соединение достаётся ожидающему потоку'
+        assert stats['max_wait_time'] > 0 and stats['checkouts'] == 3, \
+            'Проверьте, что пул считает время ожидания соединения'
+        pool.checkin(second, discard=True)
+        assert second.closed and pool.stats()['in_use'] == 1, \
+            'Проверьте, что сломанное соединение закрывается, а не возвращается в пул'
+
+    def test_02_health_check_and_max_age(self):
+        pool = ConnectionPool(size=1, check=lambda connection: not connection.broken)
+        connection = pool.checkout(FakeConnection)
+        connection.broken = True
+        pool.checkin(connection)
+        fresh = pool.checkout(FakeConnection)
+        assert fresh is not connection and connection.closed, \
+            'Проверьте, что соединение, не прошедшее проверку, заменяется новым'
+        fresh.broken = False
+        pool.max_age = 0
+        pool.checkin(fresh)
+        assert fresh.closed and pool.stats()['idle'] == 0, \
+            'Проверьте, что соединение старше MAX_AGE не возвращается в пул'
+
+    def test_03_pooled_backend(self, pooled):
+        connection = pooled['pooled']
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id integer)')
+        raw = connection.connection
+        connection.close()
+        other = ConnectionHandler(pooled.databases)['pooled']
+        with other.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM item')
+        assert other.connection is raw, \
+            'Проверьте, что закрытое соединение возвращается в пул и выдаётся снова'
+        stats = pool_stats()['pooled']
+        assert (stats['connects'], stats['checkouts'], stats['in_use']) == (1, 2, 1), \
+            'Проверьте метрики пула соединений'
+        other.errors_occurred = True
+        other.close()
+        assert pool_stats()['pooled']['idle'] == 0, \
+            'Проверьте, что соединение после ошибки не возвращается в пул'
+
+    def test_04_health_checks(self, pooled, monkeypatch):
+        connection = pooled['pooled']
+        connection.ensure_connection()
+        raw = connection.connection
+        monkeypatch.setattr(health, 'connections', pooled)
+        checks = []
+
+        def is_usable():
+            checks.append(connection.connection)
+            return len(checks) > 1
+
+        monkeypatch.setattr(connection, 'is_usable', is_usable)
+        health.reset_health_checks(sender=None)
+        assert checks == [], \
+            'Проверьте, что соединение не проверяется в начале запроса'
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        assert checks == [raw], \
+            'Проверьте, что соединение проверяется при первом обращении к базе'
+        assert connection.connection is not None \
+            and pool_stats()['pooled']['checkouts'] == 2, \
+            'Проверьте, что неработающее соединение заменяется новым'
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        health.reset_health_checks(sender=None)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        assert len(checks) == 2, \
+            'Проверьте, что соединение проверяется не больше раза за запрос'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_metrics_endpoint(self, client, user_client, pooled):
+        with pooled['pooled'].cursor():
+            pass
+        response = user_client.get('/api/v1/metrics/db-pool/')
+        assert response.status_code == 200 and response.json()['pooled']['in_use'] == 1, \
+            'Проверьте, что `/api/v1/metrics/db-pool/` отдаёт метрики пулов администратору'
+        response = client.get('/api/v1/metrics/db-pool/')
+        assert response.status_code == 401, \
+            'Проверьте, что метрики пула недоступны анонимному пользователю'